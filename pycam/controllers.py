@@ -270,7 +270,8 @@ class Camera(CameraSpecs):
         open(lock, 'a').close()
 
         # Save image
-        cv2.imwrite(filename, self.image, [cv2.IMWRITE_PNG_COMPRESSION, 0])
+        cv2.imwrite(filename, self.image, [cv2.IMWRITE_PNG_COMPRESSION, 1,
+                                           cv2.IMWRITE_PNG_STRATEGY, cv2.IMWRITE_PNG_STRATEGY_FILTERED])
         self.filename = filename
 
         # Remove lock to free image for transfer
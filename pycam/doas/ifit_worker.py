@@ -675,7 +675,7 @@ class IFitWorker:
         dark_full = np.zeros([self.spec_specs.pix_num, len(ss_spectra)])
         for i, ss_spectrum in enumerate(ss_spectra):
             # Load image. Coadd.
-            wavelengths, dark_full[:, i] = load_spectrum(os.path.join(spec_dir, ss_spectrum))
+            wavelengths, dark_full[:, i] = load_spectrum(os.path.join(spec_dir, ss_spectrum), mmap=True)
 
         # Coadd images to creat single image
         dark_spec = np.mean(dark_full, axis=1)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+"""
+Numba kernels for reducing dense optical flow fields to a coarse grid of vectors for display on GUI figures
+"""
+
+import numpy as np
+from pycam.gui._numba_compat import njit, prange
+
+FILTER_HALF_WIDTH = 2   # Half-width of mean filter applied around each grid point (2 -> 5x5 filter)
+
+
+@njit('int64[:](int64, int64, float64)', cache=True, nogil=True)
+def grid_centres(length, num, border_frac):
+    """
+    Pixel indices of grid point centres along one dimension of the flow field
+    :param length:      int     Length of dimension [pixels]
+    :param num:         int     Number of grid points
+    :param border_frac: float   Fraction of dimension excluded at each edge
+    """
+    start = border_frac * length
+    span = length * (1 - 2 * border_frac)
+    centres = np.empty(num, dtype=np.int64)
+    for i in range(num):
+        centres[i] = min(int(start + (i + 0.5) * span / num), length - 1)
+    return centres
+
+
+@njit('float32[:, :, ::1](float32[:, :, ::1], int64, int64, float64)', parallel=True, fastmath=True, cache=True,
+      nogil=True)
+def sample_flow_grid(flow_xy, grid_ny, grid_nx, border_frac):
+    """
+    Samples a dense flow field on a regular grid, taking the mean flow in a 5x5 window around each grid point. This is
+    equivalent to mean filtering the whole field and then subsampling it, but only evaluates the filter where needed
+    :param flow_xy:     np.ndarray  (height, width, 2) C-contiguous float32 flow field [x, y displacements]
+    :param grid_ny:     int         Number of grid points in y
+    :param grid_nx:     int         Number of grid points in x
+    :param border_frac: float       Fraction of the field excluded at each edge
+    :return:            np.ndarray  (grid_ny, grid_nx, 2) grid of mean flow vectors
+    """
+    height, width = flow_xy.shape[0], flow_xy.shape[1]
+    ys = grid_centres(height, grid_ny, border_frac)
+    xs = grid_centres(width, grid_nx, border_frac)
+
+    grid = np.zeros((grid_ny, grid_nx, 2), dtype=np.float32)
+    for i in prange(grid_ny):
+        y_0 = max(ys[i] - FILTER_HALF_WIDTH, 0)
+        y_1 = min(ys[i] + FILTER_HALF_WIDTH + 1, height)
+        for j in range(grid_nx):
+            x_0 = max(xs[j] - FILTER_HALF_WIDTH, 0)
+            x_1 = min(xs[j] + FILTER_HALF_WIDTH + 1, width)
+            sum_x = 0.0
+            sum_y = 0.0
+            for y in range(y_0, y_1):
+                for x in range(x_0, x_1):
+                    sum_x += flow_xy[y, x, 0]
+                    sum_y += flow_xy[y, x, 1]
+            num_pix = (y_1 - y_0) * (x_1 - x_0)
+            grid[i, j, 0] = sum_x / num_pix
+            grid[i, j, 1] = sum_y / num_pix
+    return grid
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+"""
+Numba kernels for extracting ICA line profiles from images displayed on GUI figures
+"""
+
+import numpy as np
+from pycam.gui._numba_compat import njit, NUMBA_AVAILABLE
+
+if NUMBA_AVAILABLE:
+    from numba import types
+
+    # float32 and float64 images. Images are typed as read-only, so that read-only arrays (e.g. cached placeholder
+    # images) are accepted - writable arrays also match these signatures
+    _SAMPLE_LINE_SIGS = [types.float64[:](types.Array(dtype, 2, 'A', readonly=True), types.float64, types.float64,
+                                          types.float64, types.float64, types.int64)
+                         for dtype in (types.float32, types.float64)]
+else:
+    _SAMPLE_LINE_SIGS = None
+
+
+@njit(_SAMPLE_LINE_SIGS, cache=True, fastmath=True, nogil=True)
+def sample_line(img, x0, y0, x1, y1, n_samples):
+    """
+    Samples image along a line using bilinear interpolation (equivalent to pyplis' first order get_line_profile())
+    :param img:         np.ndarray  2D float32 or float64 image array
+    :param x0:          float       Start x coordinate of line [pixels]
+    :param y0:          float       Start y coordinate of line [pixels]
+    :param x1:          float       End x coordinate of line [pixels]
+    :param y1:          float       End y coordinate of line [pixels]
+    :param n_samples:   int         Number of points sampled along line
+    :return:            np.ndarray  Image values along line
+    """
+    height, width = img.shape
+    profile = np.empty(n_samples, dtype=np.float64)
+    for i in range(n_samples):
+        t = i / (n_samples - 1) if n_samples > 1 else 0.0
+        x = min(max(x0 + t * (x1 - x0), 0.0), width - 1.0)
+        y = min(max(y0 + t * (y1 - y0), 0.0), height - 1.0)
+        x_f = int(np.floor(x))
+        y_f = int(np.floor(y))
+        x_c = min(x_f + 1, width - 1)
+        y_c = min(y_f + 1, height - 1)
+        dx = x - x_f
+        dy = y - y_f
+        profile[i] = ((1 - dx) * (1 - dy) * img[y_f, x_f] + dx * (1 - dy) * img[y_f, x_c] +
+                      (1 - dx) * dy * img[y_c, x_f] + dx * dy * img[y_c, x_c])
+    return profile
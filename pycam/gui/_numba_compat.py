@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+
+"""
+Optional numba import for the kernels used by GUI figures (_flow_numba, _ica_numba).
+Kernels are given explicit signatures, so they are compiled (or loaded from cache) on import rather than on first use.
+If numba is not available, NUMBA_AVAILABLE is False and njit/prange are replaced by stand-ins, so the kernels still
+work but run as plain python. Callers with a faster non-numba alternative should use NUMBA_AVAILABLE to choose it
+"""
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    print('Numba could not be imported, GUI figure kernels will run without JIT compilation')
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit which returns the decorated function unchanged"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
@@ -13,6 +13,9 @@ from pycam.doas.ifit_worker import IFitWorker
 from pycam.so2_camera_processor import UnrecognisedSourceError
 from pycam.utils import make_circular_mask_line
 from pycam.io_py import save_pcs_line, load_pcs_line
+from pycam.gui._flow_numba import sample_flow_grid, grid_centres
+from pycam.gui._ica_numba import sample_line
+from pycam.gui._numba_compat import NUMBA_AVAILABLE
 
 from pyplis import LineOnImage, Img
 from pyplis.helpers import make_circular_mask, shifted_color_map
@@ -38,9 +41,30 @@ import os
 import time
 import queue
 import threading
+import functools
 from pandas import Series
 
 refresh_rate = 200    # Refresh rate of draw command when in processing thread
+ica_orientations = ('right', 'left')     # ICA normal orientations, indexed by values of ImageSO2.ica_orient
+
+
+@functools.lru_cache(maxsize=None)
+def _get_cmap(name):
+    """Returns the matplotlib colourmap of this name. Cached, as lookups only ever come from a small set of names"""
+    return cm.get_cmap(name)
+
+
+@functools.lru_cache(maxsize=None)
+def _line_colours(num_lines, name='jet', colours=100):
+    """
+    Returns tuple of RGBA colours spread evenly across a colourmap, used to colour lines drawn on images
+    :param num_lines:   int     Number of line colours
+    :param name:        str     Name of colourmap
+    :param colours:     int     Number of colours in cmap
+    """
+    cmap = cm.get_cmap(name, colours)
+    # Single vectorised colourmap call, converted to tuples so the cached colours are immutable
+    return tuple(tuple(colour) for colour in cmap(np.linspace(0, 1, num_lines)))
 
 
 class SequenceInfo:
@@ -217,11 +241,13 @@ class ImageSO2(LoadSaveProcessingSettings):
         self.xcorr_ica_young = 0
         self.PCS_lines_list = [None] * self.max_lines           # Pyplis line objects list
         self.ica_plt_list = [None] * self.max_lines             # Plot line objects list
+        self.ica_artists_list = [[] for i in range(self.max_lines)]   # Artists drawn for each pyplis line
+        self.ica_xy = np.full((self.max_lines, 4), np.nan)      # Line coordinates [x0, y0, x1, y1] (NaN if no line)
+        self.ica_orient = np.zeros(self.max_lines, dtype=np.int8)  # Index of normal orientation in ica_orientations
         self.ica_coords = []                                    # Coordinates for most recent line plot
         self.scat_ica_point = None
-        colours = 100                                           # Number of colours in cmap
-        cmap = cm.get_cmap("jet", colours)
-        self.line_colours = [cmap(int(f * (colours / (self.max_lines-1)))) for f in range(self.max_lines)]  # Line colours
+        self._bg = None                                         # Cached axes background used for blitting
+        self.line_colours = _line_colours(self.max_lines)      # Line colours
 
         # Colour map
         self.cmaps = ['Reds',
@@ -251,6 +277,10 @@ class ImageSO2(LoadSaveProcessingSettings):
         # Optical flow plotting option
         self._plt_flow = tk.IntVar()
         self.plt_flow = 1
+        self.flow_grid = (12, 16)           # Number of optical flow vectors displayed [y, x]
+        self.flow_border_frac = 0.05        # Fraction of flow field ignored at each edge when displaying vectors
+        self.flow_quiver = None             # Quiver artist displaying optical flow
+        self._flow_grid_key = None          # Flow field ROI and shape that flow_quiver positions relate to
 
         # Interactive mode
         self._interactive_mode = tk.IntVar()
@@ -264,7 +294,11 @@ class ImageSO2(LoadSaveProcessingSettings):
         self.frame = ttk.Frame(self.parent, relief=tk.RAISED, borderwidth=2)
 
         if self.image_tau is None:
-            self.image_tau = np.random.random([self.pix_num_y, self.pix_num_x]) * self.specs._max_DN
+            self.image_tau = ImageSO2._default_image((self.pix_num_y, self.pix_num_x), self.specs._max_DN)
+        else:
+            self.image_tau = np.asarray(self.image_tau).astype(np.float32, copy=False)
+        if self.image_cal is not None:
+            self.image_cal = np.asarray(self.image_cal).astype(np.float32, copy=False)
 
         # Generate frame options
         self._build_options()
@@ -281,6 +315,19 @@ class ImageSO2(LoadSaveProcessingSettings):
 
         self.frame.columnconfigure(2, weight=1)
 
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _default_image(cls, shape, max_DN):
+        """
+        Placeholder image displayed before any real image is loaded. Cached so all instances with the same camera
+        settings share one (read-only) array rather than each allocating and filling its own
+        :param shape:   tuple   (pix_num_y, pix_num_x) of image
+        :param max_DN:  int     Maximum digital number of camera, which the image is scaled to
+        """
+        img = np.random.random(shape).astype(np.float32) * np.float32(max_DN)
+        img.flags.writeable = False
+        return img
+
     def initiate_variables(self):
         """Initiates variables to be loaded"""
         self.vars = {'amb_roi': list}
@@ -358,7 +405,7 @@ class ImageSO2(LoadSaveProcessingSettings):
 
     @property
     def cmap(self):
-        return getattr(cm, self._cmap.get())
+        return _get_cmap(self._cmap.get())
 
     @cmap.setter
     def cmap(self, value):
@@ -431,9 +478,16 @@ class ImageSO2(LoadSaveProcessingSettings):
         self.prev_butt.grid(row=0, column=0, sticky='nsew')
         self.next_butt.grid(row=0, column=1, sticky='nsew')
 
-        # Create figure
-        self.fig, self.axes = plt.subplots(2, 2, figsize=self.fig_size, dpi=self.dpi,
-                                    gridspec_kw={'height_ratios': [self.h_ratio, 1], 'width_ratios': [self.w_ratio, 1]})
+        # Create figure. Use plt.Figure rather than plt.subplots() so the figure isn't registered with pyplot, which
+        # would build a figure manager for the interactive backend. It is only rendered through the Tk canvas below.
+        self.fig = plt.Figure(figsize=self.fig_size, dpi=self.dpi)
+
+        # Layout is fixed by subplots_adjust(), so make sure no automatic layout engine (e.g. enabled through rcParams)
+        # recomputes it on each draw. The placeholder 'none' engine leaves the layout untouched (matplotlib >= 3.6)
+        if getattr(self.fig, 'get_layout_engine', lambda: None)() is not None:
+            self.fig.set_layout_engine('none')
+        self.axes = self.fig.subplots(2, 2, gridspec_kw={'height_ratios': [self.h_ratio, 1],
+                                                         'width_ratios': [self.w_ratio, 1]})
         self.axes[1, 1].axis('off')  # Make bottom-right subplot blank
         self.fig.subplots_adjust(left=0.05, right=0.92, top=0.95, bottom=0.05, wspace=0.00)
 
@@ -455,15 +509,15 @@ class ImageSO2(LoadSaveProcessingSettings):
         self.ax_xsect.tick_params(axis='both', colors=axes_colour, direction='in', top='on', right='on')
 
         # Image display
-        self.img_disp = self.ax.imshow(self.image_tau, cmap=self.cmap, interpolation='none', vmin=0,
-                                       vmax=self.specs._max_DN, aspect='equal')
+        self.img_disp = self.ax.imshow(self.image_tau, cmap=self.cmap, interpolation='none', vmin=0.0,
+                                       vmax=float(self.specs._max_DN), aspect='equal')
         self.ax.set_title(r'SO$_2$ image', color=axes_colour)
 
         # Colorbar
         # divider = make_axes_locatable(self.ax)
         # self.ax_divider = divider.append_axes("right", size="5%", pad=0.05)
         # self.cbar = plt.colorbar(self.img_disp, cax=self.ax_divider)
-        self.cbar = plt.colorbar(self.img_disp, cax=self.axes[0, 1])
+        self.cbar = self.fig.colorbar(self.img_disp, cax=self.axes[0, 1])
         self.cbar.outline.set_edgecolor(axes_colour)
         self.cbar.ax.tick_params(axis='both', colors=axes_colour, direction='in', top='on', right='on')
 
@@ -476,8 +530,10 @@ class ImageSO2(LoadSaveProcessingSettings):
         self.rect = self.ax.add_patch(patches.Rectangle((self.amb_roi[0], self.amb_roi[1]),
                                                         crop_X, crop_Y, edgecolor='black', fill=False, linewidth=1))
 
-        # Finalise canvas and gridding
+        # Finalise canvas and gridding. The draw_event handler caches the axes background for blitting, so the first
+        # draw also sets self._bg
         self.img_canvas = FigureCanvasTkAgg(self.fig, master=self.frame_fig)
+        self.img_canvas.mpl_connect('draw_event', self._on_draw)
         self.img_canvas.draw()
         self.img_canvas.get_tk_widget().grid(row=1, column=0, columnspan=2, sticky='nsew')
 
@@ -493,6 +549,35 @@ class ImageSO2(LoadSaveProcessingSettings):
         # Setup thread-safe plot update
         self.__draw_canv__()
 
+    def _on_draw(self, event):
+        """
+        Caches the image axes background after every full draw, so that interactive updates can be blitted on top of it
+        rather than re-rendering the whole figure. Animated artists are excluded from the full draw, so they are drawn
+        here on top of the cached background
+        """
+        self._bg = self.img_canvas.copy_from_bbox(self.ax.bbox)
+        if self.scat_ica_point is not None:
+            self.ax.draw_artist(self.scat_ica_point)
+
+    def _draw_idle(self):
+        """
+        Schedules a full draw of the canvas for the next time Tk is idle, so that several updates in quick succession
+        only render once. The cached background is stale until that draw happens, so it is cleared and any blitting
+        before then falls back to a full draw
+        """
+        self._bg = None
+        self.img_canvas.draw_idle()
+
+    def _blit_ica_point(self):
+        """Restores cached background and blits the current ICA click point on top of it"""
+        if self._bg is None:
+            self._draw_idle()
+            return
+        self.img_canvas.restore_region(self._bg)
+        if self.scat_ica_point is not None:
+            self.ax.draw_artist(self.scat_ica_point)
+        self.img_canvas.blit(self.ax.bbox)
+
     def _build_analysis(self):
         """Build analysis options"""
         self.frame_analysis = ttk.LabelFrame(self.frame, text='Analysis')
@@ -684,19 +769,39 @@ class ImageSO2(LoadSaveProcessingSettings):
         line.line_id = lbl
         line.color = self.line_colours[line_idx]
         self.PCS_lines_list[line_idx] = line
+        self.ica_xy[line_idx] = line.x0, line.y0, line.x1, line.y1
+        self.ica_orient[line_idx] = ica_orientations.index(line.normal_orientation)
         # Plot pyplis object on figure
-        self.PCS_lines_list[line_idx].plot_line_on_grid(ax=self.ax, include_normal=1,
-                                                       include_roi_rot=True, label=lbl)
+        self.plot_pcs_line(line_idx)
 
         # Gather variables to update pyplis_worker object
         self.gather_vars()
 
         # Redraw canvas
-        self.img_canvas.draw()
+        self._draw_idle()
 
         # Update time series lines
         self.fig_series.update_lines()
 
+    def make_pcs_line(self, line_idx):
+        """
+        Makes pyplis line from the coordinates and orientation held for this line index
+        :param line_idx:    int     Index of line in PCS_lines_list
+        """
+        x0, y0, x1, y1 = self.ica_xy[line_idx]
+        return LineOnImage(x0=x0, y0=y0, x1=x1, y1=y1, normal_orientation=ica_orientations[self.ica_orient[line_idx]],
+                           color=self.line_colours[line_idx], line_id="{}".format(line_idx))
+
+    def plot_pcs_line(self, line_idx):
+        """
+        Plots pyplis line on the image axes, keeping references to all artists it adds so they can be removed directly
+        :param line_idx:    int     Index of line in PCS_lines_list
+        """
+        children_old = set(self.ax.get_children())
+        self.PCS_lines_list[line_idx].plot_line_on_grid(ax=self.ax, include_normal=1, include_roi_rot=True,
+                                                        label="{}".format(line_idx))
+        self.ica_artists_list[line_idx] = [child for child in self.ax.get_children() if child not in children_old]
+
     def update_ica_num(self):
         """Makes necessary changes to update the number of ICA lines"""
 
@@ -714,48 +819,51 @@ class ImageSO2(LoadSaveProcessingSettings):
         if self.xcorr_ica_young > self.num_ica:       # If the xcorr_ica_young is deleted we set the xcorr back to 0
             self.xcorr_ica_young = 0
 
-        # Delete any drawn lines over the new number requested if they are present
+        # Delete any drawn lines over the new number requested if they are present. Lines are deleted without drawing
+        # and the canvas is then drawn once, rather than once per deleted line
         ica_num = self.num_ica
+        deleted = False
         for ica in self.PCS_lines_list[self.num_ica:]:
             if ica is not None:
-                self.del_ica(ica_num)
-                # self.PCS_lines_list[ica_num] = None   # I think this isn't required as it is done in del_ica
+                self._del_ica_no_draw(ica_num)
+                deleted = True
             ica_num += 1
 
         # Gather variables
         self.gather_vars()
 
+        if deleted:
+            self.update_xsect()
+            self._draw_idle()
+
     def flip_ica_normal(self):
         """Flips the normal vector of the current ICA"""
         ica_idx = self.current_ica - 1
 
-        # Get line currently being edited
+        # If current line is not none we reverse its orientation
         line = self.PCS_lines_list[ica_idx]
-        lbl = "{}".format(ica_idx)
-
-        # If current line is not none we find it's orientation and reverse it
         if line is not None:
-            self.del_ica(ica_idx, update_all=False)
-
-            if line.normal_orientation == 'right':
-                self.PCS_lines_list[ica_idx] = LineOnImage(x0=line.x0, y0=line.y0, x1=line.x1, y1=line.y1,
-                                                           normal_orientation="left", color=self.line_colours[ica_idx],
-                                                           line_id=lbl)
-
-            elif line.normal_orientation == 'left':
-                self.PCS_lines_list[ica_idx] = LineOnImage(x0=line.x0, y0=line.y0, x1=line.x1, y1=line.y1,
-                                                           normal_orientation="right", color=self.line_colours[ica_idx],
-                                                           line_id=lbl)
-
-            # Plot pyplis object on figure
-            self.PCS_lines_list[ica_idx].plot_line_on_grid(ax=self.ax, include_normal=1,
-                                                           include_roi_rot=True, label=lbl)
+            # Orientation is changed on the existing line object. pyplis computes the normal vector from the orientation
+            # when it is requested, and the rotated ROI doesn't depend on it, so only the normal arrow changes
+            self.ica_orient[ica_idx] ^= 1
+            line.normal_orientation = ica_orientations[self.ica_orient[ica_idx]]
+
+            # The arrow is symmetric about the normal, so reflecting it through the line centre flips it in place
+            arrows = [artist for artist in self.ica_artists_list[ica_idx] if isinstance(artist, patches.FancyArrow)]
+            if len(arrows) == 1:
+                arrows[0].set_xy(2 * np.array(line.center_pix) - arrows[0].get_xy())
+            else:
+                self.remove_ica_artists(ica_idx)
+                self.plot_pcs_line(ica_idx)
 
             # Gather variables to update pyplis_worker object
             self.gather_vars()
 
-            # Redraw canvas
-            self.img_canvas.draw()
+            # Only the image axes contents have changed, so they can be blitted rather than redrawing the whole canvas
+            if self._bg is not None:
+                self._blit_img_layer()
+            else:
+                self._draw_idle()
 
     def ica_draw(self, event):
         """Collects points for ICA line and then draws it when a complete line is drawn"""
@@ -782,40 +890,35 @@ class ImageSO2(LoadSaveProcessingSettings):
             # Update ica_coords with new coordinates
             self.ica_coords.append((event.xdata, event.ydata))
 
-            # Remove last click point and scatter current click
-            try:
+            # Remove last click point and scatter current click. The point is animated so that it is kept out of the
+            # cached background and can be blitted
+            if self.scat_ica_point is not None:
                 self.scat_ica_point.remove()
-            except:
-                pass
-            self.scat_ica_point = self.ax.scatter(event.xdata, event.ydata, s=50, marker='x', color='k', lw=1)
+            self.scat_ica_point = self.ax.scatter(event.xdata, event.ydata, s=50, marker='x', color='k', lw=1,
+                                                  animated=True)
 
+            # Reset axis limits. If this actually changes the view (e.g. the user had zoomed in) we need a full draw
+            lims_old = (self.ax.get_xlim(), self.ax.get_ylim())
             self.ax.set_xlim(0, self.pix_num_x - 1)
             self.ax.set_ylim(self.pix_num_y - 1, 0)
+            view_changed = lims_old != (self.ax.get_xlim(), self.ax.get_ylim())
 
             if idx == 1:
                 # Delete scatter point
-                try:
-                    self.scat_ica_point.remove()
-                except:
-                    pass
+                self.scat_ica_point.remove()
+                self.scat_ica_point = None
 
                 # Delete previous line if it exists
                 if self.PCS_lines_list[PCS_idx] is not None:
-                    self.del_ica(PCS_idx, update_all=False)
+                    self._del_ica_no_draw(PCS_idx)
 
                 # Update pyplis line object and objects in pyplis_worker
-                lbl = "{}".format(PCS_idx)
-                self.PCS_lines_list[PCS_idx] = LineOnImage(x0=self.ica_coords[0][0],
-                                                           y0=self.ica_coords[0][1],
-                                                           x1=self.ica_coords[1][0],
-                                                           y1=self.ica_coords[1][1],
-                                                           normal_orientation="right",
-                                                           color=self.line_colours[PCS_idx],
-                                                           line_id=lbl)
+                self.ica_xy[PCS_idx] = self.ica_coords[0] + self.ica_coords[1]
+                self.ica_orient[PCS_idx] = 0
+                self.PCS_lines_list[PCS_idx] = self.make_pcs_line(PCS_idx)
 
                 # Plot pyplis object on figure
-                self.PCS_lines_list[PCS_idx].plot_line_on_grid(ax=self.ax, include_normal=1,
-                                                               include_roi_rot=True, label=lbl)
+                self.plot_pcs_line(PCS_idx)
 
                 # Update lines
                 self.gather_vars()
@@ -823,60 +926,126 @@ class ImageSO2(LoadSaveProcessingSettings):
                 # Extract ICA values and plot them
                 self.update_xsect()
 
-            self.img_canvas.draw()
+                # Cross-section subplot has changed too, so a full draw is needed here
+                self._draw_idle()
+            elif view_changed:
+                self._draw_idle()
+            else:
+                # Only the click point has changed, so just blit it
+                self._blit_ica_point()
         else:
             print('Clicked outside axes bounds but inside plot window')
 
-    def del_ica(self, line_num, update_all=True):
-        """Searches axis for line object relating to pyplis line object and removes it
+    def del_ica(self, line_num):
+        """Searches axis for line object relating to pyplis line object and removes it, then updates all plots
 
         Parameters
         ----------
         line_num: int
             Index of line in PCS_lines_list
-        :param update_all:  bool
-            If True all drawing etc is done, otherwise it isn't (it will be set to False in flip_ica_normal)
         """
-        # Get line
-        line = self.PCS_lines_list[line_num]
+        self._del_ica_no_draw(line_num)
 
-        # Search for line and remove it when the correct one is found
-        plt_lines = self.ax.get_lines()
-        for l in plt_lines:
-            if l._label == line.line_id:
-                l.remove()
+        # Gather variables
+        self.gather_vars()
+
+        # Update xsect_plot
+        self.update_xsect()
 
-        # Search for everything else and remove
-        children = self.ax.get_children()
-        for child in children:
-            if isinstance(child, matplotlib.patches.FancyArrow):
-                if child._facecolor == line.color:
-                    child.remove()
-            elif isinstance(child, matplotlib.patches.Polygon):
-                if child._original_facecolor == line.color:
-                    child.remove()
+        # Redraw canvas
+        self._draw_idle()
 
+    def _del_ica_no_draw(self, line_num):
+        """Removes line from axis and resets its line object, without updating variables or drawing the canvas"""
+        self.remove_ica_artists(line_num)
 
         # Once removed, set the line to None
         self.PCS_lines_list[line_num] = None
+        self.ica_xy[line_num] = np.nan
 
-        if update_all:
-            # Gather variables
-            self.gather_vars()
-
-            # Update xsect_plot
-            self.update_xsect()
-
-            # Redraw canvas
-            self.img_canvas.draw()
+    def remove_ica_artists(self, line_num):
+        """Removes all artists drawn for a line from the image axes"""
+        for artist in self.ica_artists_list[line_num]:
+            artist.remove()
+        self.ica_artists_list[line_num] = []
 
     def change_cmap(self, cmap):
         """Change colourmap of image"""
-        # Set cmap to new value
-        self.img_disp.set_cmap(getattr(cm, cmap))
+        clim_old = self.img_disp.get_clim()
+
+        # Set cmap to new value. This is set directly rather than with set_cmap(), which would make the colourbar
+        # rebuild itself here, before scale_img() has set the new colour limits
+        self.img_disp.cmap = _get_cmap(cmap)
+
+        # Rescale image, as for the seismic cmap we use a different scale
+        self.scale_img(draw=False)
+
+        # Notify the colourbar of the new cmap. set_clim() in scale_img() only does this if the limits changed
+        self.img_disp.changed()
+
+        # If in processing, the canvas is drawn a lot, so we don't draw it here
+        if self.pyplis_worker.in_processing:
+            return
+
+        # If the colour limits are unchanged only the colours of the image and colourbar have changed, so we just redraw
+        # those and blit them. Otherwise the colourbar ticks have changed too, so we need a full draw
+        if self._bg is not None and self.img_disp.get_clim() == clim_old:
+            self._blit_img_layer()
+        else:
+            self._draw_idle()
+
+    @staticmethod
+    def _draw_axes_contents(ax):
+        """
+        Draws the contents of axes over the current canvas, skipping tick labels and text, which are left as they were
+        drawn. Tick marks are drawn inside the axes, so they are redrawn. The region under the spines is first cleared
+        to the figure background, so that anti-aliased spine edges aren't composited over their previous drawing
+        """
+        fig = ax.figure
+        renderer = fig.canvas.get_renderer()
+
+        # Clear the axes and its spines back to the figure patch, as in a full draw
+        spines = [spine for spine in ax.spines.values() if spine.get_visible()]
+        pad = renderer.points_to_pixels(max([spine.get_linewidth() for spine in spines] + [0])) / 2 + 2
+        region = Bbox.union([ax.bbox] + [spine.get_window_extent(renderer) for spine in spines]).padded(pad)
+        clip_on, clip_box = fig.patch.get_clip_on(), fig.patch.get_clip_box()
+        fig.patch.set_clip_box(region)
+        fig.patch.set_clip_on(True)
+        fig.draw_artist(fig.patch)
+        fig.patch.set_clip_box(clip_box)
+        fig.patch.set_clip_on(clip_on)
+
+        # Tick marks are drawn at the zorder of their axis, matching the order of Axes.draw()
+        artists = []
+        for child in ax.get_children():
+            if child is ax.patch or child.get_animated() or isinstance(child, matplotlib.text.Text):
+                continue
+            if isinstance(child, matplotlib.axis.Axis):
+                view_min, view_max = sorted(child.get_view_interval())
+                tick_locs = child.get_majorticklocs()
+                for tick, loc in zip(child.get_major_ticks(len(tick_locs)), tick_locs):
+                    if view_min <= loc <= view_max:
+                        artists.extend([(child.get_zorder(), tick.tick1line), (child.get_zorder(), tick.tick2line)])
+            else:
+                artists.append((child.get_zorder(), child))
+
+        ax.draw_artist(ax.patch)
+        for _, artist in sorted(artists, key=lambda x: x[0]):
+            ax.draw_artist(artist)
+
+    def _blit_img_layer(self):
+        """
+        Redraws the image and colourbar axes contents and blits them, without re-rendering the rest of the figure. Only
+        valid when nothing but the image colours or artists within the image axes have changed since the last full draw
+        """
+        self._draw_axes_contents(self.ax)
+        self._draw_axes_contents(self.cbar.ax)
 
-        # Update canvas, first rescaling image, as the seismic canvas we use a different scale
-        self.scale_img(draw=True)
+        # Update cached background before adding animated artists
+        self._bg = self.img_canvas.copy_from_bbox(self.ax.bbox)
+        if self.scat_ica_point is not None:
+            self.ax.draw_artist(self.scat_ica_point)
+        self.img_canvas.blit(self.fig.bbox)
 
     def scale_img(self, draw=True):
         """
@@ -896,7 +1065,7 @@ class ImageSO2(LoadSaveProcessingSettings):
                 vmin = -self.vmax_cal
             else:
                 vmin = 0
-            self.img_disp.set_clim(vmin=vmin, vmax=self.vmax_cal)
+            self.img_disp.set_clim(vmin=float(vmin), vmax=float(self.vmax_cal))
             self.cbar.ax.set_title('ppm.m')
         else:
             # Get vmax either automatically or by defined spinbox value
@@ -908,7 +1077,7 @@ class ImageSO2(LoadSaveProcessingSettings):
                 vmin = -self.vmax_tau
             else:
                 vmin = 0
-            self.img_disp.set_clim(vmin=vmin, vmax=self.vmax_tau)
+            self.img_disp.set_clim(vmin=float(vmin), vmax=float(self.vmax_tau))
             self.cbar.ax.set_title(r'$\tau$')
 
         # Set new limits
@@ -917,56 +1086,68 @@ class ImageSO2(LoadSaveProcessingSettings):
             # If in processing, the canvas is drawn a lot, so we don't draw it here
             if not self.pyplis_worker.in_processing:
                 print('Drawing canvas')
-                self.img_canvas.draw()
+                self._draw_idle()
 
     def plt_opt_flow(self, draw=True):
-        """Plots optical flow onto figure"""
-        # Delete old optical flow lines
-        for child in self.ax.get_children():
-            del_line = False
-
-            if isinstance(child, patches.Circle):
-                del_line = True
-
-                # Loop thorugh PCS lines and check their color. If they match the current circle, don't delete
-                # We only want to delete optical flow circles
-                color = child._original_edgecolor
-                for line in self.PCS_lines_list:
-                    if line is not None:
-                        if color == line.color:
-                            del_line = False
-                            break
-
-            elif isinstance(child, mpllines.Line2D):
-                del_line = True
-
-                # Loop thorugh PCS lines and check their color. If they match the current line, don't delete
-                # We only want to delete optical flow line
-                x_dat = child.get_xdata()
-                y_dat = child.get_ydata()
-                try:
-                    coords = [[x_dat[0], y_dat[0]], [x_dat[-1], y_dat[-1]]]
-                    for line in self.PCS_lines_list:
-                        if line is not None:
-                            if line.start in coords and line.stop in coords:
-                                del_line = False
-                                break
-                except IndexError:      # Index error means we have part of the ambient ROI rect, so don't delete
-                    continue
-
-            if del_line:
-                child.remove()
-
-        if self.plt_flow:
-            # Update flow_lines
-            pyplis_worker.opt_flow.draw_flow(ax=self.ax, in_roi=True)
-            self.ax.set_xlim([0, self.pix_num_x])
-            self.ax.set_ylim([self.pix_num_y, 0])
+        """
+        Plots optical flow onto figure. The flow field within the optical flow ROI is reduced to a coarse grid of
+        vectors and drawn as a single quiver artist, which is updated in place for each new flow field
+        """
+        flow = getattr(pyplis_worker.opt_flow, 'flow', None)
+
+        if self.plt_flow and flow is not None:
+            # Flow may be calculated at a lower pyramid level than the displayed image, so get the scale between them
+            flow = np.asarray(flow, dtype=np.float32)
+            scale_x = self.pix_num_x / flow.shape[1]
+            scale_y = self.pix_num_y / flow.shape[0]
+
+            # Crop flow field to optical flow ROI
+            roi = pyplis_worker.opt_flow.settings.roi_abs
+            x_0 = max(int(roi[0] / scale_x), 0)
+            y_0 = max(int(roi[1] / scale_y), 0)
+            x_1 = max(min(int(roi[2] / scale_x), flow.shape[1]), x_0 + 1)
+            y_1 = max(min(int(roi[3] / scale_y), flow.shape[0]), y_0 + 1)
+            flow_roi = np.ascontiguousarray(flow[y_0:y_1, x_0:x_1])
+
+            grid = sample_flow_grid(flow_roi, self.flow_grid[0], self.flow_grid[1], self.flow_border_frac)
+            u = grid[:, :, 0] * scale_x
+            v = grid[:, :, 1] * scale_y
+
+            # Only rebuild the quiver if the grid positions have changed, otherwise just update the vectors
+            grid_key = (x_0, y_0, x_1, y_1, flow.shape)
+            if self.flow_quiver is not None and grid_key == self._flow_grid_key:
+                self.flow_quiver.set_UVC(u, v)
+            else:
+                if self.flow_quiver is not None:
+                    self.flow_quiver.remove()
+                ys = (grid_centres(y_1 - y_0, self.flow_grid[0], self.flow_border_frac) + y_0) * scale_y
+                xs = (grid_centres(x_1 - x_0, self.flow_grid[1], self.flow_border_frac) + x_0) * scale_x
+                x_grid, y_grid = np.meshgrid(xs, ys)
+                self.flow_quiver = self.ax.quiver(x_grid, y_grid, u, v, color='lime', angles='xy',
+                                                  scale_units='xy', scale=1, width=0.003)
+                self._flow_grid_key = grid_key
+                self.ax.set_xlim([0, self.pix_num_x])
+                self.ax.set_ylim([self.pix_num_y, 0])
+
+        elif self.flow_quiver is not None:
+            # Remove old optical flow vectors
+            self.flow_quiver.remove()
+            self.flow_quiver = None
 
         if draw:
             self.q.put(1)
             # self.img_canvas.draw()
 
+    @staticmethod
+    def _line_profile(line, img):
+        """
+        Extracts profile of image along pyplis line. Without numba the kernel is a plain python loop, which is slower
+        than pyplis' own get_line_profile(), so that is used instead
+        """
+        if not NUMBA_AVAILABLE:
+            return line.get_line_profile(img)
+        return sample_line(img, float(line.x0), float(line.y0), float(line.x1), float(line.y1), line.length())
+
     def update_xsect(self):
         """Updates corss-section subplot"""
         # Clear axis
@@ -976,13 +1157,13 @@ class ImageSO2(LoadSaveProcessingSettings):
             for line in self.pyplis_worker.PCS_lines_all:
                 if isinstance(line, LineOnImage):
                     line_id = str(int(line.line_id) + 1)
-                    self.ax_xsect.plot(line.get_line_profile(self.image_cal), color=line.color, label=line_id)
+                    self.ax_xsect.plot(self._line_profile(line, self.image_cal), color=line.color, label=line_id)
             self.ax_xsect.set_ylabel('CD [ppm.m]', color=axes_colour)
         else:
             for line in self.pyplis_worker.PCS_lines_all:
                 if isinstance(line, LineOnImage):
                     line_id = str(int(line.line_id) + 1)
-                    self.ax_xsect.plot(line.get_line_profile(self.image_tau), color=line.color, label=line_id)
+                    self.ax_xsect.plot(self._line_profile(line, self.image_tau), color=line.color, label=line_id)
             self.ax_xsect.set_ylabel(r'$\tau$', color=axes_colour)
 
         # Set xsection aspect ratio
@@ -1007,7 +1188,12 @@ class ImageSO2(LoadSaveProcessingSettings):
         if isinstance(img_tau, Img):
             img_tau = img_tau.img
         if isinstance(img_cal, Img):
-            img_cal = np.copy(img_cal.img) / pyplis_worker.ppmm_conv
+            img_cal = img_cal.img / pyplis_worker.ppmm_conv
+
+        # Display images as float32 - halves the memory matplotlib has to push through when compositing the image
+        img_tau = img_tau.astype(np.float32, copy=False)
+        if img_cal is not None:
+            img_cal = img_cal.astype(np.float32, copy=False)
 
         self.image_tau = img_tau
         self.image_cal = img_cal
@@ -1352,6 +1538,10 @@ class GeomSettings:
     This object should be instantiated on startup, so a conf file needs to do this, and then the generate_frame() method
     should be used at the point at which it is required
     """
+    # Types of values held in geometry setup files
+    _geom_casts = {'volcano': str, 'altitude': int, 'lat': float, 'lon': float, 'alt_offset': float, 'elev': float,
+                   'azim': float}
+
     def __init__(self, parent=None, generate_frame=False, geom_path=FileLocator.CAM_GEOM, fig_setts=gui_setts):
         self.parent = parent
         self.frame = None
@@ -1815,21 +2005,24 @@ class GeomSettings:
         if filepath is None:
             self.filename = filedialog.askopenfilename(initialdir=self.geom_path)
 
+        # Extract key-value pairs, ignoring comments
         with open(self.filename, 'r') as f:
-            for line in f:
-                # Ignore first line
-                if line[0] == '#':
-                    continue
-
-                # Extract key-value pair, remove the newline character from the value, then recast
-                key, value = line.split('=')
-                value = value.replace('\n', '')
-                if key == 'volcano':
-                    setattr(self, key, value)
-                elif key == 'altitude':
-                    setattr(self, key, int(value))
-                else:
-                    setattr(self, key, float(value))
+            geom = dict(line.rstrip('\n').split('=', 1) for line in f if line[0] != '#' and '=' in line)
+
+        # Recast values and set tk variables directly
+        geom_vars = {'volcano': self._volcano,
+                     'lat': self._lat,
+                     'lon': self._lon,
+                     'altitude': self._altitude,
+                     'alt_offset': self._alt_offset,
+                     'elev': self._elev,
+                     'azim': self._azim}
+        for key, value in geom.items():
+            value = self._geom_casts.get(key, float)(value)
+            if key in geom_vars:
+                geom_vars[key].set(value)
+            else:
+                setattr(self, key, value)
 
         # Update geometry settings
         self.update_geom(show_info)
@@ -4976,10 +5169,9 @@ class LightDilutionSettings(LoadSaveProcessingSettings):
         self.max_lines = 5
         self.lines_A = [None] * self.max_lines
         self.lines_pyplis = [None] * self.max_lines
-        cmap = cm.get_cmap("jet", 100)
-        self.line_colours = [cmap(int(f * (100 / (self.max_lines - 1)))) for f in
-                             range(self.max_lines)]  # Line colours
+        self.line_colours = _line_colours(self.max_lines)  # Line colours
         self.line_coords = []
+        self.scat_ica_point = None
 
         self.pdx = 5
         self.pdy = 5
@@ -5636,10 +5828,8 @@ class LightDilutionSettings(LoadSaveProcessingSettings):
             self.line_coords.append((int(np.round(event.xdata)), int(np.round(event.ydata))))
 
             # Remove last click point and scatter current click
-            try:
+            if self.scat_ica_point is not None:
                 self.scat_ica_point.remove()
-            except:
-                pass
             self.scat_ica_point = self.ax.scatter(event.xdata, event.ydata, s=50, marker='x', color='k', lw=1)
 
             self.ax.set_xlim(0, self.pix_num_x - 1)
@@ -5647,10 +5837,8 @@ class LightDilutionSettings(LoadSaveProcessingSettings):
 
             if idx == 1:
                 # Delete scatter point
-                try:
-                    self.scat_ica_point.remove()
-                except:
-                    pass
+                self.scat_ica_point.remove()
+                self.scat_ica_point = None
 
                 # Delete previous line if it exists
                 if self.lines_pyplis[line_idx] is not None:
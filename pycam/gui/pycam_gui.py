@@ -1,9 +1,14 @@
 # -*- coding: utf-8 -*-
 
 """Main GUI script to be run as main executable"""
-# Enables Basemap import by pointing to (tested this 2022-04-1 by removing it - not actually sure I lost any functionality)
-# import os
-# os.environ["PROJ_LIB"] = 'C:\\Users\\tw9616\\Anaconda3\\envs\\py38\\Lib\\site-packages\\pyproj'
+# Enables Basemap import by pointing PROJ_LIB to pyproj's data directory. This is looked up from pyproj rather than
+# hardcoded, and is only set if not already defined, so pyproj doesn't have to search for its data on import
+import os
+try:
+    from pyproj.datadir import get_data_dir
+    os.environ.setdefault("PROJ_LIB", get_data_dir())
+except Exception:
+    pass
 
 # import sys
 # sys.path.append("C:\\Users\\tw9616\\Documents\\PostDoc\\Permanent Camera\\PyCamPermanent\\")
@@ -32,6 +37,9 @@ import sys
 import warnings
 # warnings.simplefilter("ignore", UserWarning)    # Ignore UserWarnings, in particular tight_layout which is annoying
 
+# Theme's default notebook tab layout - queried once, as PyCam then turns the tab layout off
+_default_notebook_tab_layout = None
+
 
 class PyCam(ttk.Frame):
     def __init__(self, root, x_size, y_size):
@@ -67,7 +75,10 @@ class PyCam(ttk.Frame):
         self.style.set_theme('breeze')
         self.style.configure('.', font=('Helvetica', font_size))
 
-        self.layout_old = self.style.layout('TNotebook.Tab')
+        global _default_notebook_tab_layout
+        if _default_notebook_tab_layout is None:
+            _default_notebook_tab_layout = self.style.layout('TNotebook.Tab')
+        self.layout_old = _default_notebook_tab_layout
         self.style.layout('TNotebook.Tab', [])          # Turns off notepad bar
 
         # Menu bar setup
@@ -94,7 +105,18 @@ class PyCam(ttk.Frame):
         self.info_load()
 
     def info_load(self):
-        """Instantiates all frames which require some kind of start-up instantiation"""
+        """
+        Instantiates all frames which require some kind of start-up instantiation. Only the acquisition/communication
+        handlers are set up immediately; the rest is scheduled on the Tk event loop so that the window can be shown
+        and repainted while it loads
+        """
+        self._info_load_critical()
+
+        self._deferred_loads = self._info_load_deferred()
+        self.root.after_idle(self._info_load_deferred_step)
+
+    def _info_load_critical(self):
+        """Instantiates frames needed as soon as the GUI is shown"""
         instrument_cfg.initiate_variable(self)
         basic_acq_handler.initiate_variables(self)
         automated_acq_handler.add_settings_objs(self.cam_wind.acq_settings, self.spec_wind.acq_settings)
@@ -106,24 +128,45 @@ class PyCam(ttk.Frame):
         geom_settings.initiate_variables(self)
         process_settings.initiate_variables(self)
         calibration_wind.add_gui(self)
-        plume_bg.initiate_variables(self)
-        plume_bg.start_draw(self.root)
-        doas_fov.start_draw(self.root)      # start drawing of frame
-        doas_fov.initiate_variables(self)
-        cell_calib.initiate_variables(self)
-        cross_correlation.start_draw(self.root)
-        cross_correlation.initiate_variables(self)
-        opti_flow.initiate_variables(self)
-        light_dilution.add_gui(self)
-        light_dilution.initiate_variables()
-        light_dilution.start_draw(self.root)
-        self.menu.load_frame.img_reg_frame = self.cam_wind.img_reg_frame
-        self.menu.load_frame.load_all()
-
-        # Load in initial sequence directory
-        pyplis_worker.doas_worker = doas_worker     # Set DOAS worker to pyplis attribute
-        pyplis_worker.load_sequence(pyplis_worker.img_dir, plot_bg=False)
-        doas_worker.load_dir(prompt=False, plot=True)
+
+    def _info_load_deferred(self):
+        """Returns list of start-up steps which can be deferred until the GUI is shown, in the order to run them"""
+
+        def load_sequence():
+            # Load in initial sequence directory
+            pyplis_worker.doas_worker = doas_worker  # Set DOAS worker to pyplis attribute
+            pyplis_worker.load_sequence(pyplis_worker.img_dir, plot_bg=False)
+
+        def load_all():
+            self.menu.load_frame.img_reg_frame = self.cam_wind.img_reg_frame
+            self.menu.load_frame.load_all()
+
+        return [lambda: plume_bg.initiate_variables(self),
+                lambda: plume_bg.start_draw(self.root),
+                lambda: doas_fov.start_draw(self.root),      # start drawing of frame
+                lambda: doas_fov.initiate_variables(self),
+                lambda: cell_calib.initiate_variables(self),
+                lambda: cross_correlation.start_draw(self.root),
+                lambda: cross_correlation.initiate_variables(self),
+                lambda: opti_flow.initiate_variables(self),
+                lambda: light_dilution.add_gui(self),
+                light_dilution.initiate_variables,
+                lambda: light_dilution.start_draw(self.root),
+                load_all,
+                load_sequence,
+                lambda: doas_worker.load_dir(prompt=False, plot=True)]
+
+    def _info_load_deferred_step(self):
+        """
+        Runs the next deferred start-up step, then schedules the following one so Tk can repaint in between. The next
+        step is scheduled even if this one raises, so the error is still reported by Tk but the remaining steps run
+        """
+        if not self._deferred_loads:
+            return
+        try:
+            self._deferred_loads.pop(0)()
+        finally:
+            self.root.after_idle(self._info_load_deferred_step)
 
     def exit_app(self):
         """Closes application"""
@@ -5,15 +5,22 @@ Contains some simple functions for saving data
 """
 
 from .setupclasses import SpecSpecs, CameraSpecs, FileLocator
-from .utils import check_filename
+from .utils import check_filename, wait_for_hosts
 import numpy as np
 import os
 import datetime
 import time
+import concurrent.futures
+import array
+import re
 try:
     import RPi.GPIO as GPIO
 except ImportError:
     pass
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
 from tkinter import filedialog
 try:
     from pyplis import LineOnImage
@@ -26,8 +33,14 @@ try:
 except ModuleNotFoundError:
     print('OpenCV could not be imported, there may be some issues caused by this')
 
+# Default file specifications, read once rather than creating new specs objects every time a file is saved
+_SPEC_EXT = SpecSpecs().file_ext
+_CAM_DATESTR = CameraSpecs().file_datestr
+
+_SECS_PER_DAY = 24 * 60 * 60   # Length of daily witty pi schedule [seconds]
 
-def save_img(img, filename, ext='.png'):
+
+def save_img(img, filename, ext='.png', compression=1, strategy=None):
     """Saves image
     img: np.array
         Image array to be saved
@@ -35,19 +48,70 @@ def save_img(img, filename, ext='.png'):
         File path for saving
     ext: str
         File extension for saving, including "."
+    compression: int
+        PNG zlib compression level (0-9). The default low level is fast to encode but still much smaller than
+        uncompressed output, so suits rapid image sequences. Higher levels (e.g. 6) suit rarely saved images
+    strategy: int
+        OpenCV PNG compression strategy flag. If None, cv2.IMWRITE_PNG_STRATEGY_FILTERED is used, which suits the
+        smoothly varying data in camera images
     """
+    if strategy is None:
+        strategy = cv2.IMWRITE_PNG_STRATEGY_FILTERED
+
+    # Encode image in memory before locking, so the lock is only held while the file is being written
+    success, buf = cv2.imencode(ext, img, [cv2.IMWRITE_PNG_COMPRESSION, compression,
+                                           cv2.IMWRITE_PNG_STRATEGY, strategy])
+    if not success:
+        print('Could not encode image for saving: {}'.format(filename))
+        return
+
     lock = filename.replace(ext, '.lock')
     open(lock, 'a').close()
 
-    # Save image
-    cv2.imwrite(filename, img, [cv2.IMWRITE_PNG_COMPRESSION, 0])
+    # Save image in a single write
+    with open(filename, 'wb') as f:
+        f.write(buf)
 
     # Remove lock to free image for transfer
     os.remove(lock)
 
 
+def _save_npy_fast(filename, arrays):
+    """Saves 1D arrays of equal length as rows of a single 2D array in .npy format. The .npy header is written
+    directly and each array's buffer is then written after it, so the arrays are never stacked into a new array
+    arrays: list
+        List of 1D NumPy arrays to be saved
+    filename: str
+        File path for saving
+    """
+    arrays = [np.ascontiguousarray(arr) for arr in arrays]
+    dtype = np.result_type(*arrays)
+    length = len(arrays[0])
+    if any(arr.ndim != 1 or len(arr) != length for arr in arrays):
+        raise ValueError('Arrays must be 1D and of equal length to be saved as a single .npy array')
+
+    header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (len(arrays), length)}
+    with open(filename, 'wb') as f:
+        np.lib.format.write_array_header_1_0(f, header)
+        for arr in arrays:
+            f.write(memoryview(arr.astype(dtype, copy=False)))
+
+
+def _write_npy(f, arr):
+    """Writes array to an already open binary file in .npy format. The header is written directly followed by the
+    array's buffer, skipping the checks np.save makes for pickled object arrays
+    f: file
+        File object opened for binary writing
+    arr: NumPy array
+        Array to be saved (must not be an object array)
+    """
+    arr = np.ascontiguousarray(arr)
+    np.lib.format.write_array_header_1_0(f, np.lib.format.header_data_from_array_1_0(arr))
+    f.write(memoryview(arr))
+
+
 def save_spectrum(wavelengths, spectrum, filename):
-    """Saves spectrum as numpy .mat file
+    """Saves spectrum as numpy .npy file
     wavelengths: NumPy array-like object
         Wavelength values held in array
     spectrum: NumPy array-like object
@@ -56,47 +120,60 @@ def save_spectrum(wavelengths, spectrum, filename):
         File path for saving
     """
     # Create lock file to secure file until saving is complete
-    lock = filename.replace(SpecSpecs().file_ext, '.lock')
+    lock = filename.replace(_SPEC_EXT, '.lock')
     open(lock, 'a').close()
 
-    # Pack wavelengths and spectrum into single array
-    spec_array = np.array([wavelengths, spectrum])
-
-    # Save spectrum
-    np.save(filename, spec_array)
+    # Save wavelengths and spectrum as rows of a single array
+    _save_npy_fast(filename, [np.asarray(wavelengths), np.asarray(spectrum)])
 
     # Remove lock
     os.remove(lock)
 
 
-def load_spectrum(filename):
-    """Essentially a wrapper to numpy load function, with added filename check
-    :param  filename:   str     Full path of spectrum to be loaded"""
+def load_spectrum(filename, mmap=False):
+    """Loads spectrum saved as .npy file, with added filename check
+    :param  filename:   str     Full path of spectrum to be loaded
+    :param  mmap:       bool    If True, the file is memory-mapped and read-only views of it are returned, so data is
+                                only read from disk when it is accessed. Useful when spectra are immediately copied
+                                elsewhere (e.g. coadding), as no intermediate array is allocated"""
     try:
-        check_filename(filename, SpecSpecs().file_ext.split('.')[-1])
+        check_filename(filename, _SPEC_EXT.split('.')[-1])
     except:
         raise
-    spec_array = np.load(filename)
+    spec_array = np.load(filename, mmap_mode='r' if mmap else None)
     wavelengths = spec_array[0, :]
     spectrum = spec_array[1, :]
     return wavelengths, spectrum
 
 
+def _spec_txt_2_npy_file(pathname):
+    """Converts a single spectrum text file to a numpy array file"""
+    try:
+        # pandas' C parser is much faster than np.loadtxt, but pandas may not be available
+        if pd is not None:
+            spec = pd.read_csv(pathname, sep=r'\s+', header=None, comment='#', engine='c').to_numpy()
+        else:
+            spec = np.loadtxt(pathname)
+        wavelengths = spec[:, 0]
+        spectrum = spec[:, 1]
+
+        save_spectrum(wavelengths, spectrum, os.path.splitext(pathname)[0] + '.npy')
+    except BaseException:
+        print('Error converting {} from .txt to .npy. It may not be in the expected format'.format(
+            os.path.basename(pathname)))
+
+
 def spec_txt_2_npy(directory):
     """Generates numpy arrays of spectra text files (essentially compressing them)"""
 
-    # List all text files
-    txt_files = [f for f in os.listdir(directory) if '.txt' in f]
+    # List all text files. scandir returns file type with each entry, so checking for files needs no extra stat calls
+    with os.scandir(directory) as entries:
+        txt_files = [entry.path for entry in entries if entry.name.endswith('.txt') and entry.is_file()]
 
-    for file in txt_files:
-        try:
-            spec = np.loadtxt(directory + file)
-            wavelengths = spec[:, 0]
-            spectrum = spec[:, 1]
-
-            save_spectrum(wavelengths, spectrum, directory + file.replace('txt', 'npy'))
-        except BaseException:
-            print('Error converting {} from .txt to .npy. It may not be in the expected format'.format(file))
+    # Files are independent, so are converted in parallel. pandas' C parser releases the GIL, so threads are enough
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        for pathname in txt_files:
+            executor.submit(_spec_txt_2_npy_file, pathname)
 
 
 def save_pcs_line(line, filename):
@@ -124,14 +201,15 @@ def load_pcs_line(filename, color='blue', line_id='line'):
 
     with open(filename, 'r') as f:
         for line in f:
-            if 'x=' in line:
-                coords = line.split('x=')[-1].split('\n')[0]
-                x0, x1 = [int(x) for x in coords.split(',')]
-            elif 'y=' in line:
-                coords = line.split('y=')[-1].split('\n')[0]
-                y0, y1 = [int(y) for y in coords.split(',')]
-            elif 'orientation=' in line:
-                orientation = line.split('orientation=')[-1].split('\n')[0]
+            key, sep, val = line.rstrip('\n').partition('=')
+            if not sep:
+                continue
+            if key == 'x':
+                x0, x1 = [int(x) for x in val.split(',')]
+            elif key == 'y':
+                y0, y1 = [int(y) for y in val.split(',')]
+            elif key == 'orientation':
+                orientation = val
 
     pcs_line = LineOnImage(x0=x0, y0=y0, x1=x1, y1=y1,
                            normal_orientation=orientation,
@@ -168,7 +246,21 @@ def load_fov_txt(filename):
     pass
 
 
-def save_so2_img_raw(path, img, filename=None, img_end='cal', ext='.mat'):
+def _open_img_file(full_path):
+    """
+    Opens file for writing an image to, notifying if an existing file is being overwritten. Attempting exclusive
+    creation first means the existence check is done by the open call itself rather than a separate stat
+    :param full_path:   str     Full path of file to be written
+    :return:            file    File object opened for binary writing
+    """
+    try:
+        return open(full_path, 'xb')
+    except FileExistsError:
+        print('Overwriting file to save image: {}'.format(full_path))
+        return open(full_path, 'wb')
+
+
+def save_so2_img_raw(path, img, filename=None, img_end='cal', ext='.npy'):
     """
     Saves tau or calibrated image. Saves the raw_data
     :param path:        str     Directory path to save image to
@@ -177,9 +269,9 @@ def save_so2_img_raw(path, img, filename=None, img_end='cal', ext='.mat'):
     :param img_end:     str     End of filename - describes the type of file
     :param ext:         str     File extension (takes .mat, .npy, .fts)
     """
-    # Define accepted save types
-    save_funcs = {'.mat': scipy.io.savemat,
-                  '.npy': np.save,
+    # Define accepted save types. MATLAB files are written uncompressed (v5) for speed
+    save_funcs = {'.mat': lambda f, obj: scipy.io.savemat(f, obj, do_compression=False, format='5', oned_as='row'),
+                  '.npy': _write_npy,
                   '.fts': None}
 
     if filename is not None:
@@ -192,7 +284,7 @@ def save_so2_img_raw(path, img, filename=None, img_end='cal', ext='.mat'):
 
     if filename is None:
         # Put time into a string
-        time_str = img.meta['start_acq'].strftime(CameraSpecs().file_datestr)
+        time_str = img.meta['start_acq'].strftime(_CAM_DATESTR)
 
         filename = '{}_{}{}'.format(time_str, img_end, ext)
 
@@ -201,9 +293,6 @@ def save_so2_img_raw(path, img, filename=None, img_end='cal', ext='.mat'):
     else:
         full_path = os.path.join(path, filename)
 
-        if os.path.exists(full_path):
-            print('Overwriting file to save image: {}'.format(full_path))
-
         # If we are saving as a matlab file we need to make a dictionary to save for the scipy.io.savemat argument
         if ext == '.mat':
             save_obj = {'img': img.img}
@@ -211,7 +300,8 @@ def save_so2_img_raw(path, img, filename=None, img_end='cal', ext='.mat'):
             save_obj = img.img
 
         # SAVE IMAGE
-        save_funcs[ext](full_path, save_obj)
+        with _open_img_file(full_path) as f:
+            save_funcs[ext](f, save_obj)
 
 
 def save_so2_img(path, img, filename=None, compression=0, max_val=None):
@@ -224,25 +314,33 @@ def save_so2_img(path, img, filename=None, compression=0, max_val=None):
     """
     if filename is None:
         # Put time into a string
-        time_str = img.meta['start_acq'].strftime(CameraSpecs().file_datestr)
+        time_str = img.meta['start_acq'].strftime(_CAM_DATESTR)
 
         filename = '{}_img.png'.format(time_str)
     full_path = os.path.join(path, filename)
-    if os.path.exists(full_path):
-        print('Overwriting file to save image: {}'.format(full_path))
 
-    # Scale image and convert to 8-bit
+    # Scale image and convert to 8-bit. Clipping is done into a new array so the image itself isn't modified
     if max_val is None:
         max_val = np.nanmax(img.img)
-    arr = img.img
-    arr[arr > max_val] = max_val
-    arr[arr < 0] = 0
-    im2save = np.array((arr / max_val) * 255, dtype=np.uint8)
+    arr = np.clip(img.img, 0, max_val)
+    # Scale in place at the image's own float precision, so no second full-size array is made (integer images need
+    # converting to float first)
+    if not np.issubdtype(arr.dtype, np.floating):
+        arr = arr.astype(float)
+    arr /= max_val
+    arr *= 255
+    np.nan_to_num(arr, copy=False)
+    im2save = arr.astype(np.uint8)
 
     png_compression = [cv2.IMWRITE_PNG_COMPRESSION, compression]  # Set compression value
 
-    # Save image
-    cv2.imwrite(full_path, im2save, png_compression)
+    # Save image - encoded in memory so that it can be written to the file opened by _open_img_file()
+    success, buf = cv2.imencode('.png', im2save, png_compression)
+    if not success:
+        print('Could not encode SO2 image for saving: {}'.format(full_path))
+        return
+    with _open_img_file(full_path) as f:
+        f.write(buf)
 
 
 def save_emission_rates_as_txt(path, emission_dict, save_all=False):
@@ -260,19 +358,17 @@ def save_emission_rates_as_txt(path, emission_dict, save_all=False):
     emis_attrs = ['_start_acq', '_phi', '_phi_err', '_velo_eff', '_velo_eff_err']
 
     # Try to make directory if it is not valid
-    if not os.path.exists(path):
-        try:
-            os.mkdir(path)
-        except BaseException as e:
-            print('Could not save emission rate data as path definition is not valid:\n'
-                  '{}'.format(e))
+    try:
+        os.makedirs(path, exist_ok=True)
+    except BaseException as e:
+        print('Could not save emission rate data as path definition is not valid:\n'
+              '{}'.format(e))
 
     # Loop through lines (includes 'total' and save data to it
     for line_id in emission_dict:
         # Make dir for specific line if it doesn't already exist
         line_path = os.path.join(path, 'line_{}'.format(line_id))
-        if not os.path.exists(line_path):
-            os.mkdir(line_path)
+        os.makedirs(line_path, exist_ok=True)
 
         for flow_mode in emission_dict[line_id]:
             emis_dict = emission_dict[line_id][flow_mode]
@@ -282,20 +378,28 @@ def save_emission_rates_as_txt(path, emission_dict, save_all=False):
 
             # Make line directory
             full_path = os.path.join(line_path, flow_mode)
-            if not os.path.exists(full_path):
-                os.mkdir(full_path)
+            os.makedirs(full_path, exist_ok=True)
 
             start_time = emis_dict._start_acq[0]
             start_time_hr = start_time.hour
             end_time_hr = emis_dict._start_acq[-1].hour
             if not save_all:
                 end_time_hr -= 1           # We don't want the most recent hour as this may contain incomplete data
-                if end_time_hr < start_time_hr:
-                    # In this case there is no data to be saved, so we move to next dataset
-                    continue
+            if end_time_hr < start_time_hr:
+                # In this case there is no data to be saved (or the data crosses midnight), so we move to next dataset
+                continue
 
-            # Have to make a new EmissionRates object to save data
-            for hour in range(start_time_hr, end_time_hr + 1):
+            # Data is time-sorted, so each hour's data is a contiguous slice and the slice boundaries for all hours can
+            # be found with one search
+            acq_times = np.asarray(emis_dict._start_acq)
+            hour_starts = [start_time.replace(hour=hour, minute=0, second=0, microsecond=0)
+                           for hour in range(start_time_hr, end_time_hr + 1)]
+            hour_bounds = np.searchsorted(acq_times, hour_starts + [hour_starts[-1] + datetime.timedelta(hours=1)],
+                                          side='left')
+
+            # Find which hours need saving
+            to_save = []
+            for i, hour in enumerate(range(start_time_hr, end_time_hr + 1)):
                 # Arrange times of file
                 file_date = start_time.strftime(date_fmt)
                 file_start_time = start_time.replace(hour=hour, minute=0, second=0)
@@ -308,171 +412,121 @@ def save_emission_rates_as_txt(path, emission_dict, save_all=False):
                 pathname = os.path.join(full_path, filename)
 
                 # We don't overwrite data, so if the file already exists we continue without saving
-                if os.path.exists(pathname):
-                    continue
-                else:
-                    # Make new emission rates object to save
-                    emis_rates = EmissionRates(line_id, velo_mode=flow_mode)
-                    indices = tuple([(file_start_time <= np.array(emis_dict._start_acq)) &
-                                     (np.array(emis_dict._start_acq) <= file_end_time)])
-                    # Loop through attributes in emission rate object and set them to new object
-                    # This loop is just cleaner than writing out each attribute...
-                    for attr in emis_attrs:
-                        setattr(emis_rates, attr, np.array(getattr(emis_dict, attr))[indices])
-
-                    # Save object
-                    emis_rates.to_pandas_dataframe().to_csv(pathname)
+                if not os.path.exists(pathname):
+                    to_save.append((pathname, hour_bounds[i], hour_bounds[i + 1]))
 
+            if len(to_save) == 0:
+                continue
 
-def write_witty_schedule_file(filename, time_on, time_off, time_on_2=None, time_off_2=None):
-    """
-    Writes a file for controlling the Witty Pi on/off scheduling
-    :param filename:    str         Full path to file for writing
-    :param time_on:     datetime    Time to turn pi on each day
-    :param time_off:    datetime    Time to turn pi off each day
-    :param time_on_2:   datetime    Time to turn pi on each day (2nd schedule)
-    :param time_off_2:  datetime    Time to turn pi off each day (2nd schedule)
-    """
-    time_fmt = '%H:%M:%S'
-    time_on_str = time_on.strftime(time_fmt)
-    date_now = datetime.datetime.now()
-    date_now_str = date_now.strftime('%Y-%m-%d')
+            # Convert data spanning all hours to be saved to a dataframe once, then save each hour as a slice of it
+            # Have to make a new EmissionRates object to save data
+            data_start, data_end = to_save[0][1], to_save[-1][2]
+            emis_rates = EmissionRates(line_id, velo_mode=flow_mode)
+            # Loop through attributes in emission rate object and set them to new object
+            # This loop is just cleaner than writing out each attribute...
+            for attr in emis_attrs:
+                setattr(emis_rates, attr, np.asarray(getattr(emis_dict, attr))[data_start:data_end])
+            emis_df = emis_rates.to_pandas_dataframe()
+
+            for pathname, hour_start, hour_end in to_save:
+                # Save hour of data. A large write buffer means the file is written in very few system calls
+                with open(pathname, 'w', newline='', buffering=1 << 20) as f:
+                    emis_df.iloc[hour_start - data_start:hour_end - data_start].to_csv(f)
 
-    if time_off_2 is None or time_on_2 is None:
-        if time_off - time_on > datetime.timedelta(0):
-            time_delt_on = time_off - time_on
-            num_hours_on, rem = divmod(time_delt_on.total_seconds(), 60*60)
-            num_mins_on = rem / 60
 
-            time_delt_off = datetime.timedelta(hours=24) - time_delt_on
-            num_hours_off, rem = divmod(time_delt_off.total_seconds(), 60 * 60)
-            num_mins_off = rem / 60
+def save_emission_rates_as_npz(path, emission_dict):
+    """
+    Saves emission rates as a single uncompressed numpy archive per line and flow mode, containing every attribute of
+    the time series. Unlike the hourly text files this is one file per dataset, and each attribute can be loaded from it
+    on its own, e.g. np.load(filename)['_phi']. Times are stored as datetime64 so the archive can be loaded without
+    pickling
+    :param path:            str     Directory to save to
+    :param emission_dict:   dict    Dictionary of emission rates for different lines and different flow modes
+                                    Assumed to be time-sorted
+    """
+    file_fmt = "pyplis_EmissionRates_{}.npz"
+    date_fmt = "%Y%m%d"
+    emis_attrs = ['_phi', '_phi_err', '_velo_eff', '_velo_eff_err']
 
-        elif time_off - time_on < datetime.timedelta(0):
-            time_delt_off = time_on - time_off
-            num_hours_off, rem = divmod(time_delt_off.total_seconds(), 60 * 60)
-            num_mins_off = rem / 60
+    for line_id in emission_dict:
+        for flow_mode in emission_dict[line_id]:
+            emis_dict = emission_dict[line_id][flow_mode]
+            if len(emis_dict._start_acq) == 0:
+                continue
 
-            time_delt_on = datetime.timedelta(hours=24) - time_delt_off
-            num_hours_on, rem = divmod(time_delt_on.total_seconds(), 60 * 60)
-            num_mins_on = rem / 60
+            full_path = os.path.join(path, 'line_{}'.format(line_id), flow_mode)
+            os.makedirs(full_path, exist_ok=True)
+            filename = file_fmt.format(emis_dict._start_acq[0].strftime(date_fmt))
 
-        else:
-            # TODO time_off and time on are the same - we don't ever turn the pi off. Work out how to cancel script use
-            # TODO on witty pi
-            num_hours_on, num_mins_on = 24, 0
-            num_hours_off, num_mins_off = 0, 0
+            arrays = {attr: np.asarray(getattr(emis_dict, attr), dtype=float) for attr in emis_attrs}
+            arrays['_start_acq'] = np.asarray(emis_dict._start_acq, dtype='datetime64[us]')
+            np.savez(os.path.join(full_path, filename), **arrays)
 
-        with open(filename, 'w', newline='\n') as f:
-            f.write('# Raspberry Pi start-up/shut-down schedule script\n')
 
-            # Add lines for quicker/easier access when reading file
-            f.write('# on_time={}\n'.format(time_on.strftime('%H:%M')))
-            f.write('# off_time={}\n'.format(time_off.strftime('%H:%M')))
+def _secs_since_midnight(time_obj):
+    """Converts the time of day of a datetime/time object to integer seconds since midnight"""
+    return time_obj.hour * 3600 + time_obj.minute * 60 + time_obj.second
 
-            f.write('BEGIN {} {}\n'.format(date_now_str, time_on_str))
-            f.write('END 2038-01-01 12:00:00\n')
-            f.write('ON H{:.0f} M{:.0f}\n'.format(num_hours_on, num_mins_on))
-            f.write('OFF H{:.0f} M{:.0f}\n'.format(num_hours_off, num_mins_off))
 
-    else:
-        # Arrange time ons and time offs to be in consecutive order, starting with the earliest time on. The final time
-        # off might be later in the day or at the start of the next day (before the time on) so to account for this we
-        # need to find the time off that follows the first time on - this becomes time_stop_1 regardless of if it was
-        # initially time_off or time_off_2
-        if time_on < time_on_2:
-            time_start_1 = time_on
-            time_start_2 = time_on_2
-            if time_off > time_on:
-                time_stop_1 = time_off
-                time_stop_2 = time_off_2
-            else:
-                time_stop_1 = time_off_2
-                time_stop_2 = time_off
-        else:
-            time_start_1 = time_on_2
-            time_start_2 = time_on
-            if time_off_2 > time_on_2:
-                time_stop_1 = time_off_2
-                time_stop_2 = time_off
-            else:
-                time_stop_1 = time_off
-                time_stop_2 = time_off_2
-
-        # if time_start_1 < time_stop_1:
-        #     key_list = ['time_start_1', 'time_stop_1', 'time_start_2', 'time_stop_2']
-        #     str_list = ['ON', 'OFF', 'ON', 'OFF']
-        # elif time_start_1 > time_stop_1:
-        #     key_list =
-
-        # Time_1 will always have to be time_on < time_off if valid, so easy to calculate first part
-        time_delt_1 = time_stop_1 - time_start_1
-        num_hours_on_1, rem = divmod(time_delt_1.total_seconds(), 60*60)
-        num_mins_on_1 = rem / 60
-
-        # Time off 1 is simlarly easy
-        time_delt_2 = time_start_2 - time_stop_1
-        num_hours_off_1, rem = divmod(time_delt_2.total_seconds(), 60*60)
-        num_mins_off_1 = rem / 60
-
-        if time_stop_2 > time_start_2:
-            time_delt_3 = time_stop_2 - time_start_2
-            num_hours_on_2, rem = divmod(time_delt_3.total_seconds(), 60*60)
-            num_mins_on_2 = rem / 60
-
-            time_delt_4 = datetime.timedelta(hours=24) - (time_delt_1 + time_delt_2 + time_delt_3)
-            num_hours_off_2, rem = divmod(time_delt_4.total_seconds(), 60*60)
-            num_mins_off_2 = rem / 60
-        else:
-            time_delt_3 = time_start_1 - time_stop_2
-            num_hours_off_2, rem = divmod(time_delt_3.total_seconds(), 60*60)
-            num_mins_off_2 = rem / 60
-
-            time_delt_4 = datetime.timedelta(hours=24) - (time_delt_1 + time_delt_2 + time_delt_3)
-            num_hours_on_2, rem = divmod(time_delt_4.total_seconds(), 60*60)
-            num_mins_on_2 = rem / 60
-
-        with open(filename, 'w', newline='\n') as f:
-            f.write('# Raspberry Pi start-up/shut-down schedule script\n')
-
-            # Add lines for quicker/easier access when reading file
-            f.write('# on_time={}\n'.format(time_on.strftime('%H:%M')))
-            f.write('# off_time={}\n'.format(time_off.strftime('%H:%M')))
-            f.write('# on_time_2={}\n'.format(time_on_2.strftime('%H:%M')))
-            f.write('# off_time_2={}\n'.format(time_off_2.strftime('%H:%M')))
-            f.write('BEGIN {} {}\n'.format(date_now_str, time_start_1.strftime(time_fmt)))
-            f.write('END 2038-01-01 12:00:00\n')
-            f.write('ON H{:.0f} M{:.0f}\n'.format(num_hours_on_1, num_mins_on_1))
-            f.write('OFF H{:.0f} M{:.0f}\n'.format(num_hours_off_1, num_mins_off_1))
-            f.write('ON H{:.0f} M{:.0f}\n'.format(num_hours_on_2, num_mins_on_2))
-            f.write('OFF H{:.0f} M{:.0f}\n'.format(num_hours_off_2, num_mins_off_2))
+def write_witty_schedule_file(filename, time_on, time_off, time_on_2=None, time_off_2=None):
+    """
+    Writes a file for controlling the Witty Pi on/off scheduling
+    :param filename:    str         Full path to file for writing
+    :param time_on:     datetime    Time to turn pi on each day
+    :param time_off:    datetime    Time to turn pi off each day
+    :param time_on_2:   datetime    Time to turn pi on each day (2nd schedule)
+    :param time_off_2:  datetime    Time to turn pi off each day (2nd schedule)
+    """
+    date_now_str = datetime.datetime.now().strftime('%Y-%m-%d')
+
+    # Add lines for quicker/easier access when reading file
+    schedules = [(time_on, time_off)]
+    lines = ['# Raspberry Pi start-up/shut-down schedule script',
+             '# on_time={}'.format(time_on.strftime('%H:%M')),
+             '# off_time={}'.format(time_off.strftime('%H:%M'))]
+    if time_on_2 is not None and time_off_2 is not None:
+        schedules.append((time_on_2, time_off_2))
+        lines += ['# on_time_2={}'.format(time_on_2.strftime('%H:%M')),
+                  '# off_time_2={}'.format(time_off_2.strftime('%H:%M'))]
+
+    # Normalise on/off times to integer seconds since midnight and sort them into a single daily table of events. The
+    # schedule starts at the earliest time on, and each event lasts until the next one in the table (the last
+    # event wrapping around midnight back to the first)
+    events = sorted([(_secs_since_midnight(on), 'ON') for on, _ in schedules] +
+                    [(_secs_since_midnight(off), 'OFF') for _, off in schedules])
+    first_on = next(i for i, (_, state) in enumerate(events) if state == 'ON')
+    events = events[first_on:] + events[:first_on]
+    durations = [(events[(i + 1) % len(events)][0] - secs) % _SECS_PER_DAY for i, (secs, _) in enumerate(events)]
+
+    if len(schedules) == 1 and durations[0] == 0:
+        # TODO time_off and time on are the same - we don't ever turn the pi off. Work out how to cancel script use
+        # TODO on witty pi
+        durations = [_SECS_PER_DAY, 0]
+
+    start_secs = events[0][0]
+    lines += ['BEGIN {} {:02d}:{:02d}:{:02d}'.format(date_now_str, start_secs // 3600, start_secs % 3600 // 60,
+                                                     start_secs % 60),
+              'END 2038-01-01 12:00:00']
+    lines += ['{} H{} M{}'.format(state, secs // 3600, secs % 3600 // 60)
+              for (_, state), secs in zip(events, durations)]
+
+    # Build the whole script first so it is written to the SD card in a single call
+    with open(filename, 'w', newline='\n') as f:
+        f.write('\n'.join(lines) + '\n')
 
 
 def read_witty_schedule_file(filename):
     """Read witty schedule file"""
-    on_hour, on_min = None, None
-    off_hour, off_min = None, None
-    on_hour_2, on_min_2 = None, None
-    off_hour_2, off_min_2 = None, None
+    # (hour, minute) of each time, keyed by its name in the file's comment lines, e.g. "# on_time=06:00"
+    times = {'on_time': (None, None), 'off_time': (None, None), 'on_time_2': (None, None), 'off_time_2': (None, None)}
 
     with open(filename, 'r', newline='\n') as f:
         for line in f:
-            if 'on_time=' in line:
-                on_time = line.split('=')[1].split('\n')[0]
-                on_hour, on_min = [int(x) for x in on_time.split(':')]
-            elif 'off_time=' in line:
-                off_time = line.split('=')[1].split('\n')[0]
-                off_hour, off_min = [int(x) for x in off_time.split(':')]
-            elif 'on_time_2=' in line:
-                on_time_2 = line.split('=')[1].split('\n')[0]
-                on_hour_2, on_min_2 = [int(x) for x in on_time_2.split(':')]
-            elif 'off_time_2=' in line:
-                off_time_2 = line.split('=')[1].split('\n')[0]
-                off_hour_2, off_min_2 = [int(x) for x in off_time_2.split(':')]
-    try:
-        return (on_hour, on_min), (off_hour, off_min), (on_hour_2, on_min_2), (off_hour_2, off_min_2)
-    except AttributeError:
-        print('File not in expected format to retrieve start-up/shut-down information for instrument')
+            key, sep, val = line.rstrip('\n').partition('=')
+            key = key.lstrip('# ')
+            if sep and key in times:
+                times[key] = tuple(int(x) for x in val.split(':'))
+    return times['on_time'], times['off_time'], times['on_time_2'], times['off_time_2']
 
 
 def write_script_crontab(filename, cmd, time_on):
@@ -486,26 +540,24 @@ def write_script_crontab(filename, cmd, time_on):
         print('Lengths of lists of crontab commands and times must be equal')
         return
 
-    with open(filename, 'w', newline='\n') as f:
-        f.write('# Crontab schedule file written by pycam\n')
-
-        # Setup path for shell
-        f.write('PATH=/usr/local/sbin:/usr/local/bin:/sbin:/bin:/usr/sbin:/usr/bin\n')
-
-        # Loops through commands and add them to crontab
-        for i in range(len(cmd)):
-            # Organise time object
-            time_obj = time_on[i]
-            if isinstance(time_obj, datetime.datetime):
-                time_str = '{} * * * '.format(time_obj.strftime('%M %H'))
-            # If time obj isn't datetime object we assume it is in the correct timing format for crontab
-            else:
-                time_str = time_obj + ' '
+    lines = ['# Crontab schedule file written by pycam',
+             # Setup path for shell
+             'PATH=/usr/local/sbin:/usr/local/bin:/sbin:/bin:/usr/sbin:/usr/bin']
 
-            command = cmd[i]
-            line = time_str + command
+    # Loops through commands and add them to crontab
+    for time_obj, command in zip(time_on, cmd):
+        # Organise time object
+        if isinstance(time_obj, datetime.datetime):
+            time_str = '{} * * * '.format(time_obj.strftime('%M %H'))
+        # If time obj isn't datetime object we assume it is in the correct timing format for crontab
+        else:
+            time_str = time_obj + ' '
+
+        lines.append(time_str + command)
 
-            f.write('{}\n'.format(line))
+    # Crontab is written in one call rather than line by line
+    with open(filename, 'w', newline='\n') as f:
+        f.write('\n'.join(lines) + '\n')
 
 
 def read_script_crontab(filename, cmds):
@@ -543,19 +595,43 @@ def read_temp_log(filename):
     :return:
     """
     date_fmt = '%Y-%m-%d %H:%M:%S'
+
+    if pd is None:
+        return _read_temp_log_no_pandas(filename)
+
+    # Whole file is parsed by pandas' C reader. The degree symbol may have been written in different encodings, so the
+    # file is decoded as latin-1 (which never fails) and temperatures are taken as the number preceding the units
+    try:
+        log = pd.read_csv(filename, sep=r'\s+', header=None, usecols=[0, 1, 2], dtype=str, engine='c',
+                          encoding='latin-1')
+    except pd.errors.EmptyDataError:
+        return np.array([]), np.array([])
+
+    dates = pd.to_datetime((log[0] + ' ' + log[1]).to_numpy(), format=date_fmt).to_pydatetime()
+    temps = log[2].str.extract(r'^([-+]?[0-9.]+)', expand=False).astype(float).to_numpy()
+
+    return dates, temps
+
+
+def _read_temp_log_no_pandas(filename):
+    """
+    Reads temperature log file without pandas. Temperatures are appended to a typed array, and dates are kept as ISO
+    strings which numpy then parses all at once
+    :param filename:
+    :return:
+    """
     dates = []
-    temps = []
-    with open(filename, 'r', newline='\n') as f:
+    temps = array.array('d')
+    with open(filename, 'r', encoding='latin-1') as f:
         for line in f:
             sep = line.split()
-            date_time = sep[0] + ' ' + sep[1]
-            temp = sep[2].split('°')[0].split('Â')[0]
-            date_obj = datetime.datetime.strptime(date_time, date_fmt)
-            dates.append(date_obj)
-            temps.append(float(temp))
+            if len(sep) < 3:
+                continue
+            dates.append(sep[0] + 'T' + sep[1])
+            temps.append(float(re.match(r'[-+]?[0-9.]+', sep[2]).group()))
 
-    dates = np.array(dates)
-    temps = np.array(temps)
+    dates = np.array(dates, dtype='datetime64[s]').astype(datetime.datetime)
+    temps = np.frombuffer(temps, dtype=np.float64)
 
     return dates, temps
 
@@ -565,13 +641,12 @@ def reboot_remote_pi(channel_off=16, channel_on=23, pi_ip=['169.254.10.178']):
     Reboots slave pi using channel_off and channel_on GPIOs
     NOTE this will not reboot the master pi even if the IP is changed, as the pi is not setup for GPIO off and on
     """
-    # Use BCM rather than board numbers
+    # Use BCM rather than board numbers. The off channel is set up already HIGH, as the start of its pulse
     GPIO.setmode(GPIO.BCM)
     GPIO.setup(channel_on, GPIO.OUT)
-    GPIO.setup(channel_off, GPIO.OUT)
+    GPIO.setup(channel_off, GPIO.OUT, initial=GPIO.HIGH)
 
     # Send pulse to turn off pi
-    GPIO.output(channel_off, GPIO.HIGH)
     time.sleep(0.2)
     GPIO.output(channel_off, GPIO.LOW)
     time.sleep(0.2)
@@ -580,29 +655,26 @@ def reboot_remote_pi(channel_off=16, channel_on=23, pi_ip=['169.254.10.178']):
 
     # ------------------------------------------------------------
     # Then reboot again
-    stat_dict = {}
-    stat_dict_on = {}
-    for ip in pi_ip:
-        stat_dict_on[ip] = True
-        stat_dict[ip] = False
+    # Status of pis is held as a bitmask - bit i set means pi_ip[i] is on
+    status = 0
+    status_on = (1 << len(pi_ip)) - 1
 
-    while stat_dict != stat_dict_on:
+    while status != status_on:
         # Send pulse to turn off pi
         GPIO.output(channel_on, GPIO.HIGH)
         time.sleep(0.2)
         GPIO.output(channel_on, GPIO.LOW)
-        time.sleep(20)
-
-        # For each pi attempt to connect. If we can't we flag that this pi is now turned off
-        for ip in pi_ip:
-            if not stat_dict[ip]:
-                date_str = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                ret = os.system("ping -w 1 {}".format(ip))
-                if ret == 0:
-                    with open(FileLocator.MAIN_LOG_PI, 'a', newline='\n') as f:
-                        f.write("{} remote_pi_on.py: {} now turned on\n".format(date_str, ip))
-                    stat_dict[ip] = True
-                else:
-                    with open(FileLocator.MAIN_LOG_PI, 'a', newline='\n') as f:
-                        f.write("{} remote_pi_on.py: {} no longer reachable\n".format(date_str, ip))
+
+        # Wait for the pis still off to accept connections (up to 20 s), then flag which are now turned on
+        idx_off = [i for i in range(len(pi_ip)) if not status & (1 << i)]
+        ips_off = [pi_ip[i] for i in idx_off]
+        for i, ip, reachable in zip(idx_off, ips_off, wait_for_hosts(ips_off, wait=20)):
+            date_str = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            if reachable:
+                with open(FileLocator.MAIN_LOG_PI, 'a', newline='\n') as f:
+                    f.write("{} remote_pi_on.py: {} now turned on\n".format(date_str, ip))
+                status |= 1 << i
+            else:
+                with open(FileLocator.MAIN_LOG_PI, 'a', newline='\n') as f:
+                    f.write("{} remote_pi_on.py: {} no longer reachable\n".format(date_str, ip))
     GPIO.cleanup()
\ No newline at end of file
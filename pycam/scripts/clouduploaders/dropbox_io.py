@@ -12,11 +12,15 @@ import time
 import queue
 import threading
 import datetime
+import concurrent.futures
 
 import dropbox
 from dropbox.exceptions import AuthError
 from dropbox import DropboxOAuth2FlowNoRedirect
 
+# Files larger than this are uploaded in chunks of this size through an upload session [bytes]
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
 
 class DropboxIO:
     """
@@ -25,7 +29,7 @@ class DropboxIO:
     """
     def __init__(self, refresh_token_from_file=True, refresh_token_path=FileLocator.DROPBOX_ACCESS_TOKEN,
                  root_folder=None, watch_folder=None, recursive=True, delete_after=False,
-                 save_folder=None, download_to_datedirs=True, timeout=1):
+                 save_folder=None, download_to_datedirs=True, timeout=1, upload_workers=4):
         self.refresh_token_path = refresh_token_path
         self.recursive = recursive
         self.delete_after = delete_after      # If True, the file is deleted from the local machine after upload
@@ -34,7 +38,8 @@ class DropboxIO:
         self.lock = threading.Lock()
         self.save_folder = save_folder
         self.download_to_datedirs = download_to_datedirs
-        self.uploading = False
+        self.upload_workers = upload_workers    # Number of files uploaded concurrently when uploading existing files
+        self._num_uploading = 0
         self.is_downloading = False
 
         # Access token for dropbox
@@ -64,6 +69,11 @@ class DropboxIO:
         self.cam_specs = CameraSpecs()
         self.spec_specs = SpecSpecs()
 
+    @property
+    def uploading(self):
+        """True if any file is currently being uploaded"""
+        return self._num_uploading > 0
+
     @staticmethod
     def get_root_folder_from_file(filename):
         file_contents = read_file(filename)
@@ -140,10 +150,19 @@ class DropboxIO:
         # TODO Delete file from dropbox when upload is finished
         # TODO NOTE probably not necessary as I think I solved the issue with uploading blank images (to do with not searching for lock files on pi correctly)
 
-        self.uploading = True
-        with open(full_path, "rb") as f:
-            meta = self.dbx.files_upload(f.read(), dropbox_file_path, mode=dropbox.files.WriteMode("overwrite"))
-        self.uploading = False
+        with self.lock:
+            self._num_uploading += 1
+        try:
+            with open(full_path, "rb") as f:
+                file_size = os.fstat(f.fileno()).st_size
+                if file_size <= UPLOAD_CHUNK_SIZE:
+                    meta = self.dbx.files_upload(f.read(), dropbox_file_path,
+                                                 mode=dropbox.files.WriteMode("overwrite"))
+                else:
+                    meta = self._upload_file_chunked(f, file_size, dropbox_file_path)
+        finally:
+            with self.lock:
+                self._num_uploading -= 1
 
         print('Uploaded file: {}'.format(filename))
 
@@ -152,6 +171,25 @@ class DropboxIO:
 
         return meta
 
+    def _upload_file_chunked(self, f, file_size, dropbox_file_path):
+        """
+        Uploads a large file through an upload session, so that only one chunk of it is held in memory at a time. The
+        dropbox SDK only accepts bytes for upload (not file objects or memory maps), so the file has to be read in
+        :param f:                   File object opened for binary reading
+        :param file_size:           Size of file [bytes]
+        :param dropbox_file_path:   Path to upload file to in dropbox
+        :return:
+        """
+        session = self.dbx.files_upload_session_start(f.read(UPLOAD_CHUNK_SIZE))
+        cursor = dropbox.files.UploadSessionCursor(session_id=session.session_id, offset=f.tell())
+        commit = dropbox.files.CommitInfo(path=dropbox_file_path, mode=dropbox.files.WriteMode("overwrite"))
+
+        while file_size - f.tell() > UPLOAD_CHUNK_SIZE:
+            self.dbx.files_upload_session_append_v2(f.read(UPLOAD_CHUNK_SIZE), cursor)
+            cursor.offset = f.tell()
+
+        return self.dbx.files_upload_session_finish(f.read(UPLOAD_CHUNK_SIZE), cursor, commit)
+
     def set_watch_folder(self, watch_folder, start=True):
         """
         Sets up the watch folder and starts watching to upload new data
@@ -169,33 +207,40 @@ class DropboxIO:
 
     def upload_existing_files(self, timeout=1):
         """
-        Uploads pre-existing files in folder
+        Uploads pre-existing files in folder. Uploads are limited by network round-trips rather than CPU, so several
+        files are uploaded concurrently (self.upload_workers)
         :return:
         """
-        while True:
-            # Get all existing files
-            files = os.listdir(self.watch_folder)
-            files.sort()
-            # print('File list: {}'.format(files))
-
-            # Get all pertinent files, if there are none left we return
-            data_files = [x for x in files if self.cam_specs.file_ext in x or self.spec_specs.file_ext in x]
-            if len(data_files) < 1:
-                print('Existing files all uploaded')
-                return
-
-            # Loop through all pertinent files and upload them once they are ready
-            for filename in data_files:
-                file, ext = os.path.splitext(filename)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.upload_workers) as executor:
+            while True:
+                # Get all existing files
+                files = os.listdir(self.watch_folder)
+                files.sort()
+                # print('File list: {}'.format(files))
+
+                # Get all pertinent files, if there are none left we return
+                data_files = [x for x in files if self.cam_specs.file_ext in x or self.spec_specs.file_ext in x]
+                if len(data_files) < 1:
+                    print('Existing files all uploaded')
+                    return
+
+                # Upload all pertinent files once they are ready. Results are retrieved so that any upload error is
+                # raised here
+                for _ in executor.map(lambda filename: self._upload_when_unlocked(filename, timeout), data_files):
+                    pass
+
+    def _upload_when_unlocked(self, filename, timeout):
+        """Waits for a file in the watch folder to have no lock file, then uploads it"""
+        file, ext = os.path.splitext(filename)
 
-                # Check no lock file exists
-                lock_file = os.path.join(self.watch_folder, file+'.lock')
-                time_1 = time.time()
-                while os.path.exists(lock_file) and time.time() - time_1 < timeout:
-                    time.sleep(0.05)
+        # Check no lock file exists
+        lock_file = os.path.join(self.watch_folder, file+'.lock')
+        time_1 = time.time()
+        while os.path.exists(lock_file) and time.time() - time_1 < timeout:
+            time.sleep(0.05)
 
-                # Upload file
-                self.upload_file(self.watch_folder, filename, folder=self.root_folder, delete=self.delete_after)
+        # Upload file
+        self.upload_file(self.watch_folder, filename, folder=self.root_folder, delete=self.delete_after)
 
     def directory_watch_handler(self, pathname, t):
         """Controls the watching of a directory"""
@@ -7,9 +7,8 @@ import sys
 sys.path.append('/home/pi/')
 
 import RPi.GPIO as GPIO
-import os
 import time
-from pycam.utils import read_file
+from pycam.utils import read_file, wait_for_hosts
 from pycam.setupclasses import FileLocator, ConfigInfo
 import datetime
 
@@ -25,32 +24,30 @@ GPIO.setup(channel, GPIO.OUT)
 # Get ip address
 config = read_file(FileLocator.CONFIG)
 pi_ip = config[ConfigInfo.pi_ip].split(',')
-stat_dict = {}
-stat_dict_on = {}
-for ip in pi_ip:
-    stat_dict_on[ip] = True
-    stat_dict[ip] = False
 
+# Status of pis is held as a bitmask - bit i set means pi_ip[i] is on
+status = 0
+status_on = (1 << len(pi_ip)) - 1
 
-while stat_dict != stat_dict_on:
+
+while status != status_on:
     # Send pulse to turn off pi
     GPIO.output(channel, GPIO.HIGH)
     time.sleep(0.2)
     GPIO.output(channel, GPIO.LOW)
-    time.sleep(20)
 
-    # For each pi attempt to connect. If we can't we flag that this pi is now turned off
-    for ip in pi_ip:
-        if not stat_dict[ip]:
-            date_str = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            ret = os.system("ping -w 1 {}".format(ip))
-            if ret == 0:
-                # with open(FileLocator.MAIN_LOG_PI, 'a', newline='\n') as f:
-                #     f.write("{} remote_pi_on.py: {} now turned on\n".format(date_str, ip))
-                stat_dict[ip] = True
-            else:
-                with open(FileLocator.MAIN_LOG_PI, 'a', newline='\n') as f:
-                    f.write("{} remote_pi_on.py: {} no longer reachable\n".format(date_str, ip))
+    # Wait for the pis still off to accept connections (up to 20 s), then flag which are now turned on
+    idx_off = [i for i in range(len(pi_ip)) if not status & (1 << i)]
+    ips_off = [pi_ip[i] for i in idx_off]
+    for i, ip, reachable in zip(idx_off, ips_off, wait_for_hosts(ips_off, wait=20)):
+        date_str = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if reachable:
+            # with open(FileLocator.MAIN_LOG_PI, 'a', newline='\n') as f:
+            #     f.write("{} remote_pi_on.py: {} now turned on\n".format(date_str, ip))
+            status |= 1 << i
+        else:
+            with open(FileLocator.MAIN_LOG_PI, 'a', newline='\n') as f:
+                f.write("{} remote_pi_on.py: {} no longer reachable\n".format(date_str, ip))
 
 
 # # Once turned on we shut it down again (since we seem to have SSH errors from startup
@@ -7,7 +7,8 @@ from __future__ import (absolute_import, division)
 
 from pycam.setupclasses import CameraSpecs, SpecSpecs
 from pycam.utils import make_circular_mask_line, calc_dt, get_horizontal_plume_speed
-from pycam.io_py import save_img, save_emission_rates_as_txt, save_so2_img, save_so2_img_raw
+from pycam.io_py import save_img, save_emission_rates_as_txt, save_emission_rates_as_npz, save_so2_img, \
+    save_so2_img_raw
 from pycam.directory_watcher import create_dir_watcher
 from pycam.img_import import load_picam_png
 
@@ -2973,6 +2974,7 @@ class PyplisWorker:
         print('Finalising processing...')
         # Save the final emission rates
         save_emission_rates_as_txt(self.processed_dir, self.results, save_all=True)
+        save_emission_rates_as_npz(self.processed_dir, self.results)
         self.save_processing_params()
         if save_doas:
             self.doas_worker.save_results()
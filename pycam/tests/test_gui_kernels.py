@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+"""
+pycam test module for numba kernels used in GUI figures
+"""
+
+from pycam.gui._flow_numba import sample_flow_grid, grid_centres
+from pycam.gui._ica_numba import sample_line
+from pyplis import LineOnImage
+import numpy as np
+
+
+class TestFlowKernels:
+    def test_uniform_flow(self):
+        """Uniform flow field should give the same vector at every grid point"""
+        flow = np.zeros((120, 160, 2), dtype=np.float32)
+        flow[:, :, 0] = 1.5
+        flow[:, :, 1] = -2
+        grid = sample_flow_grid(flow, 12, 16, 0.05)
+        assert grid.shape == (12, 16, 2)
+        assert np.allclose(grid[:, :, 0], 1.5)
+        assert np.allclose(grid[:, :, 1], -2)
+
+    def test_mean_filter(self):
+        """Each grid vector should be the mean of the 5x5 window around the grid point"""
+        flow = np.random.random((60, 80, 2)).astype(np.float32)
+        grid = sample_flow_grid(flow, 6, 8, 0.1)
+        ys = grid_centres(60, 6, 0.1)
+        xs = grid_centres(80, 8, 0.1)
+        for i, y in enumerate(ys):
+            for j, x in enumerate(xs):
+                window = flow[y - 2:y + 3, x - 2:x + 3]
+                assert np.allclose(grid[i, j], window.mean(axis=(0, 1)), atol=1e-5)
+
+
+class TestICAKernels:
+    def test_sample_line_gradient(self):
+        """Sampling a linear gradient should return the gradient values along the line"""
+        img = np.tile(np.arange(100, dtype=np.float32), (50, 1))
+        profile = sample_line(img, 10.0, 5.0, 60.0, 40.0, LineOnImage(10, 5, 60, 40).length())
+        assert np.allclose(profile, np.linspace(10, 60, len(profile)), atol=1e-4)
+
+    def test_sample_line_readonly(self):
+        """Read-only images (e.g. the cached placeholder image) should be sampled the same as writable ones"""
+        img = np.tile(np.arange(100, dtype=np.float32), (50, 1))
+        img_readonly = img.copy()
+        img_readonly.flags.writeable = False
+        profile = sample_line(img_readonly, 10.0, 5.0, 60.0, 40.0, 61)
+        assert np.array_equal(profile, sample_line(img, 10.0, 5.0, 60.0, 40.0, 61))
+
+    def test_sample_line_matches_pyplis(self):
+        """Profiles along random lines should match pyplis' first order get_line_profile(), including their length"""
+        rng = np.random.default_rng(0)
+        img = rng.random((120, 160)).astype(np.float32)
+        for _ in range(50):
+            x0, x1 = rng.integers(0, 160, 2)
+            y0, y1 = rng.integers(0, 120, 2)
+            if x0 == x1 and y0 == y1:
+                continue
+            line = LineOnImage(x0, y0, x1, y1)
+            profile = sample_line(img, float(line.x0), float(line.y0), float(line.x1), float(line.y1), line.length())
+            assert np.allclose(profile, line.get_line_profile(img), atol=1e-5)
+
+    def test_sample_line_bilinear(self):
+        """Midpoint between 4 pixels should be their mean"""
+        img = np.array([[0, 1], [2, 3]], dtype=np.float32)
+        profile = sample_line(img, 0.5, 0.5, 0.5, 0.5, 3)
+        assert np.allclose(profile, 1.5)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+"""
+pycam test module for io_py
+"""
+
+from pycam.io_py import save_spectrum, load_spectrum, spec_txt_2_npy, save_emission_rates_as_npz, read_temp_log, \
+    save_emission_rates_as_txt, _read_temp_log_no_pandas, write_witty_schedule_file, read_witty_schedule_file, \
+    save_so2_img_raw
+from pycam import io_py
+from types import SimpleNamespace
+import numpy as np
+import scipy.io
+import pytest
+import datetime
+import os
+
+test_data = os.path.join(os.path.dirname(__file__), 'test_data')
+
+
+class TestIO:
+    def test_load_spectrum(self):
+        """Tests load_spectrum gives the same arrays as numpy's own loader"""
+        filename = os.path.join(test_data, 'sample_spectrum.npy')
+        spec_array = np.load(filename)
+        wavelengths, spectrum = load_spectrum(filename)
+        assert np.array_equal(wavelengths, spec_array[0, :])
+        assert np.array_equal(spectrum, spec_array[1, :])
+
+    def test_save_spectrum(self, tmp_path):
+        """Tests saved spectrum is a valid .npy file which is loaded back unchanged"""
+        filename = str(tmp_path / 'temp_spectrum.npy')
+        wavelengths = np.linspace(280, 420, 2048)
+        spectrum = np.arange(2048, dtype=np.uint16)
+        save_spectrum(wavelengths, spectrum, filename)
+
+        spec_array = np.load(filename)
+        assert np.array_equal(spec_array, np.array([wavelengths, spectrum]))
+
+        wavelengths_loaded, spectrum_loaded = load_spectrum(filename)
+        assert np.array_equal(wavelengths_loaded, wavelengths)
+        assert np.array_equal(spectrum_loaded, spectrum)
+        spectrum_loaded[0] = 1.0      # Loaded spectra should be writable
+
+    def test_load_truncated_spectrum(self, tmp_path):
+        """Tests a partly written spectrum file raises an error rather than loading with missing data"""
+        filename = str(tmp_path / 'temp_spectrum.npy')
+        save_spectrum(np.linspace(280, 420, 2048), np.arange(2048.0), filename)
+        with open(filename, 'r+b') as f:
+            f.truncate(os.path.getsize(filename) - 2048 * 8)
+        with pytest.raises(ValueError):
+            load_spectrum(filename)
+
+    def test_read_temp_log(self, tmp_path):
+        """Tests temperature log is parsed with either encoding of the degree symbol"""
+        filename = str(tmp_path / 'temperature.log')
+        with open(filename, 'wb') as f:
+            f.write('2021-03-01 12:00:00 45.2°C\n'.encode('utf-8'))
+            f.write('2021-03-01 12:10:00 46.0°C\n'.encode('latin-1'))
+        for dates, temps in (read_temp_log(filename), _read_temp_log_no_pandas(filename)):
+            assert dates[0] == datetime.datetime(2021, 3, 1, 12, 0, 0)
+            assert dates[1] - dates[0] == datetime.timedelta(minutes=10)
+            assert np.allclose(temps, [45.2, 46.0])
+
+    def test_spec_txt_2_npy(self, tmp_path):
+        """Tests conversion of spectra text files to numpy files, which can then be memory-mapped"""
+        wavelengths = np.linspace(280, 420, 100)
+        spectrum = np.random.random(100) * 4000
+        np.savetxt(str(tmp_path / 'spectrum.txt'), np.transpose([wavelengths, spectrum]), header='Test spectrum')
+        np.savetxt(str(tmp_path / 'backup.txt.bak'), np.transpose([wavelengths, spectrum]))
+        spec_txt_2_npy(str(tmp_path) + os.sep)
+        assert not os.path.exists(str(tmp_path / 'backup.npy.bak'))
+
+        wavelengths_loaded, spectrum_loaded = load_spectrum(str(tmp_path / 'spectrum.npy'), mmap=True)
+        assert np.allclose(wavelengths_loaded, wavelengths)
+        assert np.allclose(spectrum_loaded, spectrum)
+
+    def test_spec_txt_2_npy_no_pandas(self, tmp_path, monkeypatch):
+        """Tests spectra text files are still converted on machines without pandas"""
+        monkeypatch.setattr(io_py, 'pd', None)
+        wavelengths = np.linspace(280, 420, 100)
+        spectrum = np.random.random(100) * 4000
+        np.savetxt(str(tmp_path / 'spectrum.txt'), np.transpose([wavelengths, spectrum]), header='Test spectrum')
+        spec_txt_2_npy(str(tmp_path) + os.sep)
+
+        wavelengths_loaded, spectrum_loaded = load_spectrum(str(tmp_path / 'spectrum.npy'))
+        assert np.allclose(wavelengths_loaded, wavelengths)
+        assert np.allclose(spectrum_loaded, spectrum)
+
+    def test_save_emission_rates_as_txt_over_midnight(self, tmp_path):
+        """Tests data crossing midnight is skipped without error, and other flow modes are still saved"""
+        def emission_rates(start, num):
+            times = [start + datetime.timedelta(minutes=i) for i in range(num)]
+            return SimpleNamespace(_start_acq=times, _phi=np.arange(num, dtype=float), _phi_err=np.ones(num),
+                                   _velo_eff=np.full(num, 5.0), _velo_eff_err=np.full(num, 0.5))
+
+        emission_dict = {'0': {'flow_glob': emission_rates(datetime.datetime(2021, 3, 1, 23, 30), 60),
+                               'flow_raw': emission_rates(datetime.datetime(2021, 3, 1, 10, 30), 60)}}
+        save_emission_rates_as_txt(str(tmp_path), emission_dict, save_all=True)
+
+        assert os.listdir(str(tmp_path / 'line_0' / 'flow_glob')) == []
+        assert sorted(os.listdir(str(tmp_path / 'line_0' / 'flow_raw'))) == \
+            ['pyplis_EmissionRates_20210301_1000_1059.txt', 'pyplis_EmissionRates_20210301_1100_1159.txt']
+
+    def test_save_emission_rates_as_npz(self, tmp_path):
+        """Tests emission rate archive holds each attribute, with times stored without pickling"""
+        times = [datetime.datetime(2021, 3, 1, 12, 0, 0) + datetime.timedelta(seconds=10 * i) for i in range(50)]
+        emis = SimpleNamespace(_start_acq=times, _phi=np.arange(50.0), _phi_err=np.ones(50),
+                               _velo_eff=np.full(50, 5.0), _velo_eff_err=np.full(50, 0.5))
+        save_emission_rates_as_npz(str(tmp_path), {'0': {'flow_glob': emis}})
+
+        archive = np.load(str(tmp_path / 'line_0' / 'flow_glob' / 'pyplis_EmissionRates_20210301.npz'))
+        assert np.array_equal(archive['_phi'], emis._phi)
+        assert archive['_start_acq'][1] - archive['_start_acq'][0] == np.timedelta64(10, 's')
+
+    def test_write_witty_schedule_file(self, tmp_path):
+        """Tests two on/off schedules are ordered from the earliest time on, including an off time after midnight"""
+        filename = str(tmp_path / 'schedule.wpi')
+        time_on, time_off = datetime.datetime(2020, 1, 1, 14, 0), datetime.datetime(2020, 1, 1, 2, 30)
+        time_on_2, time_off_2 = datetime.datetime(2020, 1, 1, 6, 15), datetime.datetime(2020, 1, 1, 10, 0)
+        write_witty_schedule_file(filename, time_on, time_off, time_on_2, time_off_2)
+
+        with open(filename, 'r') as f:
+            lines = f.read().splitlines()
+        assert lines[5].endswith(' 06:15:00')
+        assert lines[7:] == ['ON H3 M45', 'OFF H4 M0', 'ON H12 M30', 'OFF H3 M45']
+
+    def test_read_witty_schedule_file(self, tmp_path):
+        """Tests on/off times are read back from a written schedule, with the second schedule left unset if absent"""
+        filename = str(tmp_path / 'schedule.wpi')
+        write_witty_schedule_file(filename, datetime.datetime(2020, 1, 1, 6, 15), datetime.datetime(2020, 1, 1, 10, 0),
+                                  datetime.datetime(2020, 1, 1, 14, 0), datetime.datetime(2020, 1, 1, 2, 30))
+        assert read_witty_schedule_file(filename) == ((6, 15), (10, 0), (14, 0), (2, 30))
+
+        write_witty_schedule_file(filename, datetime.datetime(2020, 1, 1, 6, 15), datetime.datetime(2020, 1, 1, 21, 0))
+        assert read_witty_schedule_file(filename) == ((6, 15), (21, 0), (None, None), (None, None))
+
+    def test_save_so2_img_raw(self, tmp_path):
+        """Tests raw SO2 images are saved to .npy identically to np.save, and round trip through .mat"""
+        img = SimpleNamespace(img=np.random.random((60, 80)).astype(np.float32),
+                              meta={'start_acq': datetime.datetime(2021, 3, 1, 12, 0, 0)})
+        save_so2_img_raw(str(tmp_path), img, img_end='cal')
+        np.save(str(tmp_path / 'reference.npy'), img.img)
+        assert (tmp_path / '2021-03-01T120000_cal.npy').read_bytes() == (tmp_path / 'reference.npy').read_bytes()
+
+        save_so2_img_raw(str(tmp_path), img, filename='img.mat')
+        assert np.array_equal(scipy.io.loadmat(str(tmp_path / 'img.mat'))['img'], img.img)
@@ -4,12 +4,24 @@
 pycam test module for utils
 """
 
-from pycam.utils import read_file
+from pycam.utils import read_file, wait_for_hosts
 from pycam.setupclasses import FileLocator, ConfigInfo
+import socket
 
 class TestUtils:
     def test_read_config(self):
         """Tests reading of config file using read_file"""
         config = read_file('..\\conf\\config.txt')
 
-        print(config[ConfigInfo.host_ip])
\ No newline at end of file
+        print(config[ConfigInfo.host_ip])
+
+    def test_wait_for_hosts(self):
+        """Tests hosts are only flagged as reachable when accepting connections"""
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen()
+        port = server.getsockname()[1]
+        assert wait_for_hosts(['127.0.0.1'], wait=1, port=port) == [True]
+
+        server.close()
+        assert wait_for_hosts(['127.0.0.1'], wait=1, port=port) == [False]
@@ -10,6 +10,8 @@ import datetime
 import threading
 import shutil
 import time
+import socket
+import concurrent.futures
 
 
 def check_filename(filename, ext):
@@ -161,6 +163,60 @@ def kill_all(ips, script_name='/home/pi/pycam/scripts/kill_process.py'):
     subprocess.run(['python3', script_name], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
 
+def check_hosts_reachable(ips, port=22, timeout=1):
+    """
+    Attempts a TCP connection to each host in parallel, returning a list of flags for whether each host accepted the
+    connection. SSH is the service used to communicate with the pis, so its port is used by default
+
+    Parameters
+    ----------
+    ips: list
+        IP addresses of hosts
+    port: int
+        Port to connect to
+    timeout: float
+        Time to wait for each connection [s]
+    """
+    def probe(ip):
+        try:
+            with socket.create_connection((ip, port), timeout=timeout):
+                return True
+        except OSError:
+            return False
+
+    if len(ips) == 0:
+        return []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(ips)) as executor:
+        return list(executor.map(probe, ips))
+
+
+def wait_for_hosts(ips, wait=20, port=22, timeout=1):
+    """
+    Repeatedly probes hosts until they are all reachable or the wait time has passed (e.g. whilst waiting for a pi to
+    boot), returning a list of flags for whether each host is reachable
+
+    Parameters
+    ----------
+    ips: list
+        IP addresses of hosts
+    wait: float
+        Maximum time to wait for all hosts to become reachable [s]
+    port: int
+        Port to connect to
+    timeout: float
+        Time to wait for each connection [s]
+    """
+    status = [False] * len(ips)
+    deadline = time.time() + wait
+    while True:
+        idxs = [i for i in range(len(ips)) if not status[i]]
+        for i, reachable in zip(idxs, check_hosts_reachable([ips[i] for i in idxs], port=port, timeout=timeout)):
+            status[i] = reachable
+        if all(status) or time.time() >= deadline:
+            return status
+        time.sleep(1)
+
+
 def make_circular_mask_line(h, w, cx, cy, radius, tol=0.008):
     """Create a circular access mask for accessing certain pixels in an image. T
     aken from pyplis.helpers.make_circular_mask and adapted to only produce a line mask, rather than a filled circle